@@ -0,0 +1,277 @@
+# Drives the main endpoints in-process against SQLite, seeded at a given
+# scale with the test factories, and reports throughput, latency
+# percentiles and SQL statements per request for each scenario.
+#
+#   python -m benchmarks.api --scale 1k --save    # record the baseline
+#   python -m benchmarks.api --scale 1k --check   # fail on a regression
+#
+# Baselines live in benchmarks/baselines/api_<scale>.json. Each scenario
+# runs several rounds and timings are judged on the median across them,
+# the p50 and throughput rather than a tail percentile. Even so they
+# depend on the machine, so a slower timing only warns unless
+# --strict-timing is given; statement counts do not, and going up always
+# fails the check.
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import factory
+from sqlalchemy import event, func, insert, select
+
+from benchmarks.common import bench_client, bench_engine, summarize, timed
+from tests.conftest import TodoFactory, UserFactory
+from to_do_list.models import Todo, TodoStateCount, User
+from to_do_list.security import get_password_hash
+
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+BASELINES = Path(__file__).parent / 'baselines'
+SEED_CHUNK_SIZE = 10_000
+USERS = 10
+PASSWORD = 'bench-password'
+# logins hash with Argon2 on purpose, so they get fewer rounds
+LOGIN_SHARE = 10
+
+
+async def _seed(engine, rows: int) -> tuple[str, list[int]]:
+    users = factory.build_batch(
+        dict, USERS, FACTORY_CLASS=UserFactory, password='x' * 97
+    )
+    # the first user is the one the scenarios log in as
+    users[0]['password'] = get_password_hash(PASSWORD)
+
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), users)
+
+        for start in range(0, rows, SEED_CHUNK_SIZE):
+            size = min(SEED_CHUNK_SIZE, rows - start)
+            await conn.execute(
+                insert(Todo),
+                [
+                    {**todo, 'user_id': number % USERS + 1}
+                    for number, todo in enumerate(
+                        factory.build_batch(
+                            dict, size, FACTORY_CLASS=TodoFactory
+                        ),
+                        start,
+                    )
+                ],
+            )
+
+        # the counters the handlers keep up to date, built in one pass
+        await conn.execute(
+            insert(TodoStateCount).from_select(
+                ['user_id', 'state', 'count'],
+                select(Todo.user_id, Todo.state, func.count()).group_by(
+                    Todo.user_id, Todo.state
+                ),
+            )
+        )
+        todo_ids = await conn.scalars(
+            select(Todo.id).where(Todo.user_id == 1).order_by(Todo.id)
+        )
+
+        return users[0]['email'], todo_ids.all()
+
+
+def _scenarios(client, email, headers, todo_ids):
+    cursor = {'next': None}
+
+    async def login(number):
+        return await timed(
+            client.post(
+                '/auth/token/',
+                data={'username': email, 'password': PASSWORD},
+            )
+        )
+
+    async def list_page(number):
+        return await timed(client.get('/todos/?limit=20', headers=headers))
+
+    async def list_filtered(number):
+        return await timed(
+            client.get(
+                '/todos/?state=done&limit=20&count=estimated',
+                headers=headers,
+            )
+        )
+
+    async def list_paged(number):
+        url = '/todos/?limit=20'
+
+        if cursor['next']:
+            url += f'&cursor={cursor["next"]}'
+
+        start = perf_counter()
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        cursor['next'] = response.json()['next_cursor']
+        return perf_counter() - start
+
+    async def patch(number):
+        return await timed(
+            client.patch(
+                f'/todos/{todo_ids[number % len(todo_ids)]}',
+                headers=headers,
+                json={'title': f'patched {number}'},
+            )
+        )
+
+    async def delete(number):
+        return await timed(
+            client.delete(
+                f'/todos/{todo_ids[-1 - number % len(todo_ids)]}',
+                headers=headers,
+            )
+        )
+
+    async def users(number):
+        return await timed(client.get('/users/?limit=20', headers=headers))
+
+    return {
+        'login': login,
+        'list': list_page,
+        'list_filtered': list_filtered,
+        'list_paged': list_paged,
+        'patch': patch,
+        'delete': delete,
+        'users': users,
+    }
+
+
+async def _measure(scenario, count: int, rounds: int, statements) -> dict:
+    samples, medians, throughputs = [], [], []
+    statements.clear()
+
+    # numbering carries on across rounds, so writes keep moving through
+    # the rows instead of replaying the first round
+    for number in range(0, count * rounds, count):
+        start = perf_counter()
+        round_samples = [
+            await scenario(number + offset) for offset in range(count)
+        ]
+        elapsed = perf_counter() - start
+        samples += round_samples
+        medians.append(statistics.median(round_samples))
+        throughputs.append(count / elapsed)
+
+        # later rounds write to rows the first one already touched, which
+        # takes fewer statements, so only the first round is counted
+        if len(medians) == 1:
+            queries = len(statements)
+
+    return {
+        **summarize(samples),
+        'rounds': rounds,
+        'median_ms': round(statistics.median(medians) * 1000, 3),
+        'throughput_rps': round(statistics.median(throughputs), 1),
+        'queries_per_request': round(queries / count, 2),
+    }
+
+
+async def run(scale: str, requests: int, rounds: int) -> dict:
+    rows = SCALES[scale]
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = await bench_engine(
+            f'sqlite+aiosqlite:///{directory}/bench.db'
+        )
+        email, todo_ids = await _seed(engine, rows)
+        statements = []
+        event.listen(
+            engine.sync_engine,
+            'before_cursor_execute',
+            lambda *args: statements.append(args[2]),
+        )
+
+        async with bench_client(engine=engine) as client:
+            response = await client.post(
+                '/auth/token/', data={'username': email, 'password': PASSWORD}
+            )
+            headers = {
+                'Authorization': f'Bearer {response.json()["access_token"]}'
+            }
+            scenarios = _scenarios(client, email, headers, todo_ids)
+
+            results = {}
+            for name, scenario in scenarios.items():
+                count = (
+                    requests // LOGIN_SHARE if name == 'login' else requests
+                )
+                results[name] = await _measure(
+                    scenario, count, rounds, statements
+                )
+
+    return {'scale': scale, 'rows': rows, 'scenarios': results}
+
+
+def compare(
+    results: dict, baseline: dict, tolerance: float
+) -> tuple[list[str], list[str]]:
+    """Split regressions into statement counts and timings."""
+    queries, timings = [], []
+
+    for name, current in results['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+
+        if before is None:
+            continue
+
+        if current['median_ms'] > before['median_ms'] * (1 + tolerance):
+            timings.append(
+                f'{name}: median {current["median_ms"]} ms, '
+                f'baseline {before["median_ms"]} ms'
+            )
+
+        if current['throughput_rps'] < before['throughput_rps'] * (
+            1 - tolerance
+        ):
+            timings.append(
+                f'{name}: {current["throughput_rps"]} req/s, '
+                f'baseline {before["throughput_rps"]} req/s'
+            )
+
+        if current['queries_per_request'] > before['queries_per_request']:
+            queries.append(
+                f'{name}: {current["queries_per_request"]} queries/request, '
+                f'baseline {before["queries_per_request"]}'
+            )
+
+    return queries, timings
+
+
+def main(args: argparse.Namespace):
+    baseline_path = BASELINES / f'api_{args.scale}.json'
+    results = asyncio.run(run(args.scale, args.requests, args.rounds))
+    print(json.dumps(results, indent=2))
+
+    if args.save:
+        BASELINES.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + '\n')
+
+    if args.check:
+        baseline = json.loads(baseline_path.read_text())
+        queries, timings = compare(results, baseline, args.tolerance)
+        failures = queries + timings if args.strict_timing else queries
+
+        for regression in queries + timings:
+            label = 'REGRESSION' if regression in failures else 'WARNING'
+            print(f'{label} {regression}', file=sys.stderr)
+
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', choices=SCALES, default='1k')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--save', action='store_true')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--strict-timing', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+import statistics
+from contextlib import asynccontextmanager
+from time import perf_counter
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from to_do_list.app import app
+from to_do_list.database import get_session, set_sqlite_pragmas
+from to_do_list.models import table_registry
+from to_do_list.ratelimit import (
+    LoginLimiter,
+    MemoryRateLimitBackend,
+    get_login_limiter,
+    settings,
+)
+
+
+async def bench_engine(url='sqlite+aiosqlite:///:memory:'):
+    options = {'poolclass': StaticPool} if ':memory:' in url else {}
+    engine = create_async_engine(url, **options)
+    event.listen(engine.sync_engine, 'connect', set_sqlite_pragmas)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    return engine
+
+
+@asynccontextmanager
+async def bench_client(
+    url='sqlite+aiosqlite:///:memory:', engine=None, rate_limit=False
+):
+    engine = engine or await bench_engine(url)
+
+    async def get_session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    # the benchmarks log in far faster than the limiter lets anyone, so
+    # it is off unless it is what is being measured
+    limiter = LoginLimiter(
+        MemoryRateLimitBackend(maxsize=settings.LOGIN_RATE_LIMIT_MAX_KEYS),
+        settings.model_copy(update={'LOGIN_RATE_LIMIT_ENABLED': rate_limit}),
+    )
+    app.dependency_overrides[get_login_limiter] = lambda: limiter
+    transport = ASGITransport(app=app)
+
+    try:
+        async with AsyncClient(
+            transport=transport, base_url='http://bench'
+        ) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+async def create_account(client, username='bench', todos=0):
+    password = f'{username}-password'
+    await client.post(
+        '/users/',
+        json={
+            'username': username,
+            'email': f'{username}@bench.com',
+            'password': password,
+        },
+    )
+    response = await client.post(
+        '/auth/token/',
+        data={'username': f'{username}@bench.com', 'password': password},
+    )
+    headers = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+    for number in range(todos):
+        await client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': f'todo {number}', 'description': 'bench'},
+        )
+
+    return headers, password
+
+
+async def timed(request):
+    start = perf_counter()
+    response = await request
+    response.raise_for_status()
+    return perf_counter() - start
+
+
+def summarize(samples: list[float]) -> dict:
+    quantiles = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'requests': len(samples),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+        'p50_ms': round(quantiles[49] * 1000, 3),
+        'p95_ms': round(quantiles[94] * 1000, 3),
+        'p99_ms': round(quantiles[98] * 1000, 3),
+    }
@@ -0,0 +1,131 @@
+# Streams GET /todos/export for a large account and samples the process RSS
+# while the body is read, to check that memory stays flat with row count.
+#
+#   python -m benchmarks.export_memory --rows 1000000 --format csv
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.common import bench_client, create_account
+from to_do_list.app import app
+from to_do_list.models import Todo
+
+SEED_CHUNK_SIZE = 10_000
+
+
+def rss_mb() -> float:
+    pages = int(
+        Path('/proc/self/statm').read_text(encoding='ascii').split()[1]
+    )
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+async def _seed(url, rows):
+    engine = create_async_engine(url)
+
+    async with engine.begin() as conn:
+        for start in range(0, rows, SEED_CHUNK_SIZE):
+            await conn.execute(
+                insert(Todo),
+                [
+                    {
+                        'title': f'todo {number}',
+                        'description': 'export benchmark',
+                        'state': 'todo',
+                        'user_id': 1,
+                    }
+                    for number in range(
+                        start, min(start + SEED_CHUNK_SIZE, rows)
+                    )
+                ],
+            )
+
+    await engine.dispose()
+
+
+async def _drain_export(authorization, export_format):
+    # httpx's ASGITransport buffers the whole body, so the app is driven
+    # directly and every chunk is dropped as soon as it arrives.
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': '/todos/export',
+        'raw_path': b'/todos/export',
+        'root_path': '',
+        'query_string': f'format={export_format}'.encode(),
+        'headers': [(b'authorization', authorization.encode())],
+        'client': ('bench', 0),
+        'server': ('bench', 80),
+    }
+    exported = 0
+    peak = rss_mb()
+    requested = asyncio.Event()
+
+    async def receive():
+        if requested.is_set():
+            # the client never disconnects
+            await asyncio.Event().wait()
+
+        requested.set()
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal exported, peak
+
+        if message['type'] == 'http.response.body':
+            exported += len(message.get('body', b''))
+            peak = max(peak, rss_mb())
+
+    await app(scope, receive, send)
+
+    return exported, peak
+
+
+async def main(rows: int, export_format: str):
+    with tempfile.TemporaryDirectory() as directory:
+        url = f'sqlite+aiosqlite:///{directory}/export.db'
+
+        async with bench_client(url) as client:
+            headers, _ = await create_account(client)
+            await _seed(url, rows)
+
+            baseline = rss_mb()
+            start = perf_counter()
+            exported, peak = await _drain_export(
+                headers['Authorization'], export_format
+            )
+
+    print(
+        json.dumps(
+            {
+                'rows': rows,
+                'format': export_format,
+                'seconds': round(perf_counter() - start, 2),
+                'exported_mb': round(exported / 2**20, 1),
+                'rss_before_mb': round(baseline, 1),
+                'rss_peak_mb': round(peak, 1),
+                'rss_growth_mb': round(peak - baseline, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument(
+        '--format', choices=('ndjson', 'csv'), default='ndjson'
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.format))
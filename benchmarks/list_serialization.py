@@ -0,0 +1,104 @@
+# Compares building a 100-todo GET /todos/ body the old way (ORM entities
+# validated into TodoList, dumped to Python, then json.dumps) with the row
+# projection dumped by a TypeAdapter.
+#
+#   python -m benchmarks.list_serialization --page 100 --rounds 500
+import argparse
+import asyncio
+import json
+from time import perf_counter
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from to_do_list.database import set_sqlite_pragmas
+from to_do_list.models import Todo, User, table_registry
+from to_do_list.routers.todos import TODO_ROW_COLUMNS
+from to_do_list.schemas import TodoList, todo_page_adapter
+
+
+async def _entities(session, page):
+    todos = await session.scalars(select(Todo).order_by(Todo.id).limit(page))
+    body = TodoList.model_validate(
+        {'todos': todos.all(), 'next_cursor': None}, from_attributes=True
+    )
+    # what JSONResponse does with the dumped model
+    return json.dumps(
+        body.model_dump(mode='json'), ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+async def _rows(session, page):
+    todos = await session.execute(
+        select(*TODO_ROW_COLUMNS).order_by(Todo.id).limit(page)
+    )
+    return todo_page_adapter.dump_json({
+        'todos': [todo._asdict() for todo in todos],
+        'next_cursor': None,
+    })
+
+
+async def _measure(session, build, page, rounds):
+    start = perf_counter()
+
+    for _ in range(rounds):
+        body = await build(session, page)
+        # a fresh session per request, as in the app
+        session.expunge_all()
+
+    return body, (perf_counter() - start) / rounds
+
+
+async def main(page: int, rounds: int):
+    engine = create_async_engine(
+        'sqlite+aiosqlite:///:memory:', poolclass=StaticPool
+    )
+    event.listen(engine.sync_engine, 'connect', set_sqlite_pragmas)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            insert(User),
+            [{'username': 'bench', 'email': 'b@b.com', 'password': 'x'}],
+        )
+        await conn.execute(
+            insert(Todo),
+            [
+                {
+                    'title': f'todo {number}',
+                    'description': 'serialisation benchmark',
+                    'state': 'todo',
+                    'user_id': 1,
+                }
+                for number in range(page)
+            ],
+        )
+
+    async with AsyncSession(engine) as session:
+        old, old_time = await _measure(session, _entities, page, rounds)
+        new, new_time = await _measure(session, _rows, page, rounds)
+
+    await engine.dispose()
+
+    assert old == new, 'both paths must produce the same JSON'
+    print(
+        json.dumps(
+            {
+                'page': page,
+                'rounds': rounds,
+                'entities_us': round(old_time * 1e6, 1),
+                'rows_us': round(new_time * 1e6, 1),
+                'speedup': round(old_time / new_time, 2),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.page, args.rounds))
@@ -0,0 +1,66 @@
+# Measures GET /todos/ latency alone and while concurrent logins hammer
+# Argon2, to check that password hashing stays off the event loop. With
+# --rate-limit the login limiter is on and sheds the storm before Argon2.
+#
+#   python -m benchmarks.login_storm --requests 300 --storm 16
+import argparse
+import asyncio
+import json
+from collections import Counter
+
+from benchmarks.common import bench_client, create_account, summarize, timed
+
+
+async def _list_todos(client, headers, requests):
+    return [
+        await timed(client.get('/todos/', headers=headers))
+        for _ in range(requests)
+    ]
+
+
+async def _login_forever(client, password, stop, statuses):
+    while not stop.is_set():
+        response = await client.post(
+            '/auth/token/',
+            data={'username': 'bench@bench.com', 'password': password},
+        )
+        statuses.update([response.status_code])
+
+
+async def main(requests: int, storm: int, rate_limit: bool):
+    async with bench_client(rate_limit=rate_limit) as client:
+        headers, password = await create_account(client, todos=20)
+
+        idle = await _list_todos(client, headers, requests)
+
+        stop = asyncio.Event()
+        statuses = Counter()
+        logins = [
+            asyncio.create_task(
+                _login_forever(client, password, stop, statuses)
+            )
+            for _ in range(storm)
+        ]
+        under_storm = await _list_todos(client, headers, requests)
+        stop.set()
+        await asyncio.gather(*logins)
+
+    print(
+        json.dumps(
+            {
+                'idle': summarize(idle),
+                'login_storm': summarize(under_storm),
+                'login_statuses': dict(statuses),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--storm', type=int, default=16)
+    parser.add_argument('--rate-limit', action='store_true')
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.storm, args.rate_limit))
@@ -0,0 +1,104 @@
+# Compares entity loads with the column projections used by the read paths
+# for GET /users/ pages: time per page and bytes allocated per page.
+#
+#   python -m benchmarks.read_projection --pages 100 1000 5000
+import argparse
+import asyncio
+import json
+import tracemalloc
+from time import perf_counter
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from to_do_list.database import set_sqlite_pragmas
+from to_do_list.models import User, table_registry
+from to_do_list.routers.users import USER_ROW_COLUMNS
+from to_do_list.schemas import UserList, user_page_adapter
+
+
+async def _entities(session, page):
+    users = await session.scalars(select(User).order_by(User.id).limit(page))
+    body = UserList.model_validate(
+        {'users': users.all(), 'next_cursor': None}, from_attributes=True
+    )
+    return json.dumps(
+        body.model_dump(mode='json'), ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+async def _rows(session, page):
+    users = await session.execute(
+        select(*USER_ROW_COLUMNS).order_by(User.id).limit(page)
+    )
+    return user_page_adapter.dump_json({
+        'users': [user._asdict() for user in users],
+        'next_cursor': None,
+    })
+
+
+async def _measure(engine, build, page, rounds):
+    start = perf_counter()
+
+    for _ in range(rounds):
+        async with AsyncSession(engine) as session:
+            await build(session, page)
+
+    elapsed = (perf_counter() - start) / rounds
+
+    async with AsyncSession(engine) as session:
+        tracemalloc.start()
+        await build(session, page)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        'pages_per_second': round(1 / elapsed, 1),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+async def main(pages: list[int], rounds: int):
+    engine = create_async_engine(
+        'sqlite+aiosqlite:///:memory:', poolclass=StaticPool
+    )
+    event.listen(engine.sync_engine, 'connect', set_sqlite_pragmas)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    'username': f'user{number}',
+                    'email': f'user{number}@bench.com',
+                    # the size of an Argon2 hash, which entities drag along
+                    'password': 'x' * 97,
+                }
+                for number in range(max(pages))
+            ],
+        )
+
+    results = {}
+    for page in pages:
+        async with AsyncSession(engine) as session:
+            assert await _entities(session, page) == await _rows(
+                session, page
+            ), 'both paths must produce the same JSON'
+
+        results[page] = {
+            'entities': await _measure(engine, _entities, page, rounds),
+            'rows': await _measure(engine, _rows, page, rounds),
+        }
+
+    await engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.rounds))
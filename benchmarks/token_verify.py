@@ -0,0 +1,60 @@
+# Compares access token verification throughput for the shared-secret HS
+# path against the key ring's ES256 and EdDSA keys.
+#
+#   python -m benchmarks.token_verify --rounds 20000
+import argparse
+import json
+from time import perf_counter
+
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from to_do_list.keys import KeyRing
+
+SECRET = 'bench-secret-0123456789abcdef0123'
+PAYLOAD = {'sub': 'bench@bench.com', 'exp': 4102444800}
+
+
+def _rings() -> dict[str, KeyRing]:
+    return {
+        'HS256': KeyRing(SECRET, 'HS256'),
+        'ES256': KeyRing(
+            SECRET,
+            'HS256',
+            {'ec': ec.generate_private_key(ec.SECP256R1())},
+            'ec',
+        ),
+        'EdDSA': KeyRing(
+            SECRET,
+            'HS256',
+            {'ed': ed25519.Ed25519PrivateKey.generate()},
+            'ed',
+        ),
+    }
+
+
+def _measure(ring: KeyRing, rounds: int) -> dict:
+    token = ring.sign(PAYLOAD)
+    assert ring.verify(token) == PAYLOAD
+
+    start = perf_counter()
+    for _ in range(rounds):
+        ring.verify(token)
+    elapsed = perf_counter() - start
+
+    return {
+        'verifications_per_second': round(rounds / elapsed),
+        'us_per_verification': round(elapsed / rounds * 1_000_000, 2),
+        'token_bytes': len(token),
+    }
+
+
+def main(rounds: int):
+    results = {name: _measure(ring, rounds) for name, ring in _rings().items()}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=20_000)
+    args = parser.parse_args()
+    main(args.rounds)
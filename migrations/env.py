@@ -25,6 +25,16 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = table_registry.metadata
 
+# search backend objects are created by raw DDL in to_do_list.search and
+# must not be dropped by autogenerate
+def include_name(name, type_, parent_names):
+    if type_ == 'table':
+        return not name.startswith('todos_fts')
+    if type_ == 'index':
+        return name != 'ix_todos_search'
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,6 +57,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -78,7 +89,9 @@ def run_migrations_offline() -> None:
 
 def do_run_migrations(connection):
     context.configure(
-        connection=connection, target_metadata=target_metadata
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
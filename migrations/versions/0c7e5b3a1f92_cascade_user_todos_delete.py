@@ -0,0 +1,63 @@
+"""cascade user todos delete
+
+Revision ID: 0c7e5b3a1f92
+Revises: 9b41d6e2c8a0
+Create Date: 2026-10-18 11:48:02.336591
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c7e5b3a1f92'
+down_revision: Union[str, Sequence[str], None] = '9b41d6e2c8a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# gives the unnamed SQLite constraint the name PostgreSQL generates
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+# SQLite rebuilds the table in batch mode, which drops its triggers
+SQLITE_FTS_TRIGGERS = (
+    "CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description "
+    "ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+)
+
+
+def _replace_user_fk(ondelete) -> None:
+    with op.batch_alter_table(
+        'todos', naming_convention=NAMING_CONVENTION
+    ) as batch_op:
+        batch_op.drop_constraint('todos_user_id_fkey', type_='foreignkey')
+        batch_op.create_foreign_key(
+            'todos_user_id_fkey', 'users', ['user_id'], ['id'],
+            ondelete=ondelete,
+        )
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in SQLITE_FTS_TRIGGERS:
+            op.execute(trigger)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_user_fk(ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_user_fk(ondelete=None)
@@ -0,0 +1,30 @@
+"""add todos filter indexes
+
+Revision ID: 5f0c2a9d7e13
+Revises: de3c05130f3d
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0c2a9d7e13'
+down_revision: Union[str, Sequence[str], None] = 'de3c05130f3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_todos_user_id_state', 'todos', ['user_id', 'state'], unique=False)
+    op.create_index('ix_todos_user_id_id', 'todos', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_user_id_id', table_name='todos')
+    op.drop_index('ix_todos_user_id_state', table_name='todos')
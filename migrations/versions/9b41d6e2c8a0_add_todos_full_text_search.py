@@ -0,0 +1,68 @@
+"""add todos full text search
+
+Revision ID: 9b41d6e2c8a0
+Revises: 5f0c2a9d7e13
+Create Date: 2026-10-18 11:03:48.715220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b41d6e2c8a0'
+down_revision: Union[str, Sequence[str], None] = '5f0c2a9d7e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_TRIGGERS = (
+    "CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description "
+    "ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE todos_fts USING fts5("
+            "title, description, content='todos', content_rowid='id')"
+        )
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(trigger)
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_todos_search ON todos USING gin "
+            "(to_tsvector('simple', title || ' ' || description))"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ai')
+        op.execute('DROP TABLE IF EXISTS todos_fts')
+
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_todos_search')
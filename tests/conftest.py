@@ -1,28 +1,101 @@
 from contextlib import contextmanager
 from datetime import datetime
+from time import perf_counter
+from urllib.parse import urlsplit
 
 import factory
+import factory.fuzzy
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import event
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.pool import StaticPool
 
 from to_do_list.app import app
-from to_do_list.database import get_session
-from to_do_list.models import User, table_registry
-from to_do_list.security import get_password_hash
+from to_do_list.cache import TTLCache
+from to_do_list.database import get_session, set_sqlite_pragmas
+from to_do_list.metrics import instrument_engine
+from to_do_list.models import Todo, TodoState, User, table_registry
+from to_do_list.ratelimit import (
+    LoginLimiter,
+    MemoryRateLimitBackend,
+    get_login_limiter,
+)
+from to_do_list.security import get_password_hash, get_principal_cache
 from to_do_list.settings import Settings
+from to_do_list.stats import get_count_cache
+
+# Statement ceilings for the hot paths, checked on every request made
+# through the client fixture. They include the user lookup that a cold
+# principal cache adds to the first authenticated request.
+QUERY_BUDGETS = {
+    ('POST', '/auth/token/'): 1,
+    ('GET', '/users/'): 2,
+    ('GET', '/users/{user_id}'): 1,
+    ('PUT', '/users/{user_id}'): 2,
+    ('GET', '/users/deletions/{deletion_id}'): 1,
+    # version, page and, with ?count=, the total
+    ('GET', '/todos/'): 4,
+    ('GET', '/todos/{todo_id}'): 3,
+    ('GET', '/todos/changes'): 4,
+    ('GET', '/todos/stats'): 3,
+    ('POST', '/todos/'): 4,
+    ('PATCH', '/todos/{todo_id}'): 5,
+    ('DELETE', '/todos/{todo_id}'): 5,
+}
+
+
+def _app_routes():
+    for included in app.routes:
+        router = getattr(included, 'original_router', None)
+        yield from router.routes if router else [included]
+
+
+def _route_template(method: str, url) -> str | None:
+    path = urlsplit(str(url)).path
+
+    for route in _app_routes():
+        methods = getattr(route, 'methods', None) or ()
+
+        if method.upper() in methods and route.path_regex.match(path):
+            return route.path
+
+    return None
+
+
+class BudgetedTestClient(TestClient):
+    def __init__(self, app, engine):
+        super().__init__(app)
+        self.engine = engine
+
+    def request(self, method, url, **kwargs):
+        route = _route_template(method, url)
+        budget = QUERY_BUDGETS.get((method.upper(), route))
+
+        if budget is None:
+            return super().request(method, url, **kwargs)
+
+        label = f'{method.upper()} {route}'
+
+        with _query_budget(self.engine, budget, label):
+            return super().request(method, url, **kwargs)
 
 
 @pytest.fixture
-def client(session):
+def client(session, principal_cache, count_cache, login_limiter, monkeypatch):
     def get_session_override():
         return session
 
-    with TestClient(app) as client:
+    # the workers would run against the real database, not the session
+    monkeypatch.setenv('TRASH_PURGE_ENABLED', 'false')
+    monkeypatch.setenv('ACCOUNT_DELETION_SWEEP_ENABLED', 'false')
+
+    with BudgetedTestClient(app, session.bind.sync_engine) as client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_principal_cache] = lambda: principal_cache
+        app.dependency_overrides[get_count_cache] = lambda: count_cache
+        app.dependency_overrides[get_login_limiter] = lambda: login_limiter
         yield client
 
     app.dependency_overrides.clear()
@@ -35,6 +108,8 @@ async def session():
         connect_args={'check_same_thread': False},
         poolclass=StaticPool,
     )
+    event.listen(engine.sync_engine, 'connect', set_sqlite_pragmas)
+    instrument_engine(engine.sync_engine)
 
     async with engine.begin() as conn:
         await conn.run_sync(table_registry.metadata.create_all)
@@ -66,6 +141,101 @@ def mock_db_time():
     return _mock_db_time
 
 
+class QueryLog(list):
+    # the statements as strings, with how long each took alongside
+    def __init__(self):
+        super().__init__()
+        self.durations = []
+
+    def report(self) -> str:
+        return '\n'.join(
+            f'  {number}. [{duration * 1000:.2f} ms] {statement}'
+            for number, (statement, duration) in enumerate(
+                zip(self, self.durations), 1
+            )
+        )
+
+
+@contextmanager
+def _count_queries(engine):
+    statements = QueryLog()
+
+    # its own stack; metrics.instrument_engine pushes onto 'query_start'
+    def before_cursor_execute(conn, cursor, statement, *args):
+        conn.info.setdefault('count_queries_start', []).append(perf_counter())
+        statements.append(statement)
+
+    def after_cursor_execute(conn, *args):
+        statements.durations.append(
+            perf_counter() - conn.info['count_queries_start'].pop()
+        )
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+    yield statements
+
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    event.remove(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+@contextmanager
+def _query_budget(engine, budget: int, label: str = 'block'):
+    with _count_queries(engine) as queries:
+        yield queries
+
+    assert len(queries) <= budget, (
+        f'{label} ran {len(queries)} queries, over its budget of {budget}:\n'
+        f'{queries.report()}'
+    )
+
+
+@pytest.fixture
+def count_queries(session):
+    def count_queries():
+        return _count_queries(session.bind.sync_engine)
+
+    return count_queries
+
+
+@pytest.fixture
+def query_budget(session):
+    def query_budget(budget: int):
+        return _query_budget(session.bind.sync_engine, budget)
+
+    return query_budget
+
+
+@pytest.fixture
+def principal_cache():
+    return TTLCache(maxsize=100, ttl=60)
+
+
+@pytest.fixture
+def count_cache():
+    return TTLCache(maxsize=100, ttl=60)
+
+
+@pytest.fixture
+def login_limiter(settings):
+    return LoginLimiter(MemoryRateLimitBackend(maxsize=100), settings)
+
+
+async def _explain(session: AsyncSession, query):
+    compiled = query.compile(
+        dialect=session.bind.dialect,
+        compile_kwargs={'literal_binds': True},
+    )
+    plan = await session.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))
+
+    return ' | '.join(row.detail for row in plan)
+
+
+@pytest.fixture
+def explain():
+    return _explain
+
+
 @pytest_asyncio.fixture
 async def user(session: AsyncSession):
     password = 'password'
@@ -104,6 +274,24 @@ def token(client, user):
     return response.json()['access_token']
 
 
+@pytest.fixture
+def auth(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def create_todo(client, auth):
+    def create_todo(title='todo', state='todo', headers=auth):
+        response = client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': title, 'description': 'test', 'state': state},
+        )
+        return response.json()['id']
+
+    return create_todo
+
+
 @pytest.fixture
 def settings():
     return Settings()
@@ -116,3 +304,14 @@ class UserFactory(factory.Factory):
     username = factory.Sequence(lambda n: f'test{n}')
     email = factory.LazyAttribute(lambda obj: f'{obj.username}@test.com')
     password = factory.LazyAttribute(lambda obj: f'{obj.username}kjlshgfkj')
+
+
+class TodoFactory(factory.Factory):
+    class Meta:
+        model = Todo
+
+    title = factory.Faker('text')
+    description = factory.Faker('text')
+    # trashed todos are left out of listings, so factories never trash
+    state = factory.fuzzy.FuzzyChoice(set(TodoState) - {TodoState.trash})
+    user_id = 1
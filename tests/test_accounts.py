@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from to_do_list.accounts import resume_deletions, run_deletion_worker
+from to_do_list.models import (
+    DeletionStatus,
+    Todo,
+    TodoState,
+    User,
+    UserDeletion,
+)
+
+STALE_AFTER = timedelta(minutes=10)
+LONG_AGO = datetime(2020, 1, 1)
+
+
+async def _left_behind(session, user, status):
+    # what a deletion looks like when its process died halfway
+    user.disabled = True
+    session.add(
+        Todo(
+            title='left',
+            description='behind',
+            state=TodoState.todo,
+            user_id=user.id,
+        )
+    )
+    session.add(UserDeletion(id='gone', user_id=user.id, status=status))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'status',
+    [DeletionStatus.pending, DeletionStatus.running, DeletionStatus.failed],
+)
+async def test_resume_finishes_deletions_left_behind(
+    session, user, mock_db_time, status
+):
+    user_id = user.id
+
+    with mock_db_time(model=UserDeletion, time=LONG_AGO):
+        await _left_behind(session, user, status)
+
+    resumed = await resume_deletions(session.bind, 100, STALE_AFTER)
+
+    session.expire_all()
+    deletion = await session.get(UserDeletion, 'gone')
+    assert resumed == 1
+    assert deletion.status == DeletionStatus.done
+    assert deletion.todos_deleted == 1
+    assert await session.scalar(select(User).where(User.id == user_id)) is None
+
+
+@pytest.mark.asyncio
+async def test_resume_leaves_a_live_deletion_alone(session, user):
+    await _left_behind(session, user, DeletionStatus.running)
+
+    resumed = await resume_deletions(session.bind, 100, STALE_AFTER)
+
+    assert resumed == 0
+    assert (await session.scalars(select(Todo))).all()
+
+
+@pytest.mark.asyncio
+async def test_resume_leaves_a_finished_deletion_alone(
+    session, user, mock_db_time
+):
+    with mock_db_time(model=UserDeletion, time=LONG_AGO):
+        await _left_behind(session, user, DeletionStatus.done)
+
+    resumed = await resume_deletions(session.bind, 100, STALE_AFTER)
+
+    assert resumed == 0
+    assert (await session.scalars(select(Todo))).all()
+
+
+@pytest.mark.asyncio
+async def test_deletion_worker_survives_a_failed_sweep(monkeypatch, settings):
+    expected_sweeps = 2
+    sweeps = []
+
+    async def resume(*args):
+        sweeps.append(args)
+
+        if len(sweeps) == 1:
+            raise RuntimeError('database went away')
+
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr('to_do_list.accounts.resume_deletions', resume)
+    settings.ACCOUNT_DELETION_SWEEP_INTERVAL_SECONDS = 0
+
+    with pytest.raises(asyncio.CancelledError):
+        await run_deletion_worker(None, settings)
+
+    assert len(sweeps) == expected_sweeps
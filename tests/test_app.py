@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+import pytest
 from freezegun import freeze_time
+from sqlalchemy import event
 
+from to_do_list.models import User
+from to_do_list.routers.users import settings
 from to_do_list.schemas import UserPublic
 from to_do_list.security import create_access_token
 
@@ -24,6 +28,23 @@ def test_create_user(client):
     }
 
 
+def test_create_user_runs_lookup_and_insert_only(client, count_queries):
+    expected_queries = 2
+
+    with count_queries() as queries:
+        client.post(
+            '/users/',
+            json={
+                'username': 'alex',
+                'email': 'alex@email.com',
+                'password': '123456',
+            },
+        )
+
+    assert len(queries) == expected_queries
+    assert 'RETURNING' in queries[-1]
+
+
 def test_create_user_username_exists(client, user):
     response = client.post(
         '/users/',
@@ -59,7 +80,25 @@ def test_list_users(client, user, token):
     )
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
+
+
+def test_list_users_cursor_pagination(client, user, user_2, token):
+    response = client.get(
+        '/users/?limit=1', headers={'Authorization': f'Bearer {token}'}
+    )
+    next_cursor = response.json()['next_cursor']
+
+    assert response.json()['users'][0]['id'] == user.id
+    assert next_cursor
+
+    response = client.get(
+        f'/users/?limit=1&cursor={next_cursor}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['users'][0]['id'] == user_2.id
+    assert response.json()['next_cursor'] is None
 
 
 def test_get_user(client, user):
@@ -99,6 +138,24 @@ def test_update_user(client, user, token):
     }
 
 
+def test_update_user_runs_a_single_update(client, user, token, count_queries):
+    expected_queries = 2
+
+    with count_queries() as queries:
+        client.put(
+            f'/users/{user.id}',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'username': 'new_username',
+                'email': 'test@email.com',
+                'password': 'new_password',
+            },
+        )
+
+    assert len(queries) == expected_queries
+    assert queries[-1].startswith('UPDATE users')
+
+
 def test_update_user_without_permissions(client, user_2, token):
     response = client.put(
         f'/users/{user_2.id}',
@@ -145,8 +202,57 @@ def test_delete_user(client, user, token):
         f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
     )
 
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.json()['status'] == 'pending'
+    assert response.json()['todos_deleted'] == 0
+
+
+def test_delete_user_status_reports_progress(client, user, token):
+    expected_todos = 3
+    auth = {'Authorization': f'Bearer {token}'}
+    for number in range(expected_todos):
+        client.post(
+            '/todos/',
+            headers=auth,
+            json={'title': f'todo {number}', 'description': 'bye'},
+        )
+
+    deletion = client.delete(f'/users/{user.id}', headers=auth).json()
+    response = client.get(f'/users/deletions/{deletion["id"]}')
+
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'message': 'User deleted successfully'}
+    assert response.json() == {
+        'id': deletion['id'],
+        'status': 'done',
+        'todos_deleted': expected_todos,
+    }
+    assert client.get(f'/users/{user.id}').status_code == HTTPStatus.NOT_FOUND
+
+
+def test_delete_user_status_not_found(client):
+    response = client.get('/users/deletions/unknown')
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'Deletion not found'}
+
+
+@pytest.mark.asyncio
+async def test_disabled_user_cannot_log_in_or_use_a_token(
+    session, client, user, token
+):
+    user.disabled = True
+    await session.commit()
+
+    login = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+    listed = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert login.status_code == HTTPStatus.UNAUTHORIZED
+    assert listed.status_code == HTTPStatus.UNAUTHORIZED
 
 
 def test_delete_user_without_permission(client, user_2, token):
@@ -255,3 +361,89 @@ def test_token_expired_dont_refresh(client, user):
         )
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_get_user_runs_a_single_query(client, user, count_queries):
+    with count_queries() as queries:
+        client.get(f'/users/{user.id}')
+
+    assert len(queries) == 1
+
+
+def test_user_reads_leave_out_the_password_hash(
+    client, user, token, count_queries
+):
+    with count_queries() as queries:
+        client.get(f'/users/{user.id}')
+        client.get('/users/', headers={'Authorization': f'Bearer {token}'})
+
+    get_user_query, list_users_query = queries[0], queries[-1]
+    assert 'users.password' not in get_user_query
+    assert 'users.password' not in list_users_query
+
+
+def test_user_reads_do_not_load_entities(client, user, user_2, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    # warm the principal cache so auth does not load the user either
+    client.get('/users/', headers=headers)
+    loaded = []
+
+    def on_load(target, context):
+        loaded.append(target)
+
+    event.listen(User, 'load', on_load)
+    try:
+        client.get(f'/users/{user_2.id}')
+        client.get('/users/', headers=headers)
+    finally:
+        event.remove(User, 'load', on_load)
+
+    assert loaded == []
+
+
+def test_list_users_does_not_load_todos(client, user, token, count_queries):
+    expected_queries = 2
+
+    with count_queries() as queries:
+        client.get('/users/', headers={'Authorization': f'Bearer {token}'})
+
+    assert len(queries) == expected_queries
+    assert not any('FROM todos' in query for query in queries)
+
+
+def test_get_token_runs_a_single_query(client, user, count_queries):
+    with count_queries() as queries:
+        client.post(
+            '/auth/token/',
+            data={'username': user.email, 'password': user.clean_password},
+        )
+
+    assert len(queries) == 1
+
+
+def test_delete_user_removes_todos_in_chunks(
+    client, user, token, count_queries, monkeypatch
+):
+    expected_chunks = 3
+    auth = {'Authorization': f'Bearer {token}'}
+    monkeypatch.setattr(settings, 'ACCOUNT_DELETION_CHUNK_SIZE', 2)
+    client.post(
+        '/todos/batch',
+        headers=auth,
+        json={
+            'todos': [
+                {'title': f'todo {number}', 'description': 'bye'}
+                for number in range(4)
+            ]
+        },
+    )
+
+    with count_queries() as queries:
+        client.delete(f'/users/{user.id}', headers=auth)
+
+    chunks = [
+        query for query in queries if query.startswith('DELETE FROM todos ')
+    ]
+    assert len(chunks) == expected_chunks
+    assert all('LIMIT' in chunk for chunk in chunks)
+    assert not any(query.startswith('SELECT todos.') for query in queries)
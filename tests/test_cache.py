@@ -0,0 +1,52 @@
+import pytest
+from freezegun import freeze_time
+
+from to_do_list.cache import TTLCache
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_counts_hits_and_misses():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    await cache.set('key', 'value')
+
+    assert await cache.get('key') == 'value'
+    assert await cache.get('other') is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    with freeze_time('2025-07-14 12:00:00'):
+        await cache.set('key', 'value')
+
+    with freeze_time('2025-07-14 12:01:01'):
+        assert await cache.get('key') is None
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    await cache.set('a', 'first')
+    await cache.set('b', 'second')
+    await cache.get('a')
+    await cache.set('c', 'third')
+
+    assert await cache.get('b') is None
+    assert await cache.get('a') == 'first'
+    assert await cache.get('c') == 'third'
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_delete():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    await cache.set('a', 1)
+    await cache.delete('a')
+    await cache.delete('missing')
+
+    assert len(cache) == 0
@@ -1,10 +1,20 @@
+import asyncio
 from dataclasses import asdict
+from functools import partial
+from http import HTTPStatus
 
 import pytest
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload
 
-from to_do_list.models import User
+from to_do_list.database import (
+    MonitoredQueuePool,
+    engine_options,
+    pool_status,
+    set_sqlite_pragmas,
+)
+from to_do_list.models import Todo, TodoState, User
 
 
 @pytest.mark.asyncio
@@ -20,7 +30,9 @@ async def test_create_user(session: AsyncSession, mock_db_time):
         await session.commit()
 
     user = await session.scalar(
-        select(User).where(User.username == 'testuser')
+        select(User)
+        .options(selectinload(User.todos))
+        .where(User.username == 'testuser')
     )
 
     assert asdict(user) == {
@@ -29,6 +41,111 @@ async def test_create_user(session: AsyncSession, mock_db_time):
         'email': 'test@test.com',
         'password': 'password123',
         'todos': [],
+        'todos_version': 0,
+        'token_version': 0,
+        'disabled': False,
         'created_at': time,
         'updated_at': time,
     }
+
+
+@pytest.mark.asyncio
+async def test_deleting_user_cascades_to_todos_in_database(
+    session: AsyncSession, user, count_queries
+):
+    session.add(
+        Todo(title='t', description='d', state=TodoState.todo, user_id=user.id)
+    )
+    await session.commit()
+
+    with count_queries() as queries:
+        await session.delete(user)
+        await session.commit()
+
+    assert await session.scalar(select(func.count(Todo.id))) == 0
+    assert queries == ['DELETE FROM users WHERE users.id = ?']
+
+
+@pytest.mark.asyncio
+async def test_user_repr_does_not_load_todos(session: AsyncSession, user):
+    loaded = await session.scalar(select(User).where(User.id == user.id))
+
+    assert 'todos=' not in repr(loaded)
+
+
+def test_engine_options_skip_pool_sizing_for_memory_sqlite(settings):
+    settings.DATABASE_URL = 'sqlite+aiosqlite:///:memory:'
+
+    assert 'pool_size' not in engine_options(settings)
+
+
+def test_engine_options_size_the_pool_and_prepared_statements(settings):
+    settings.DATABASE_URL = 'postgresql+psycopg://app:secret@db/app'
+    settings.DATABASE_POOL_SIZE = 20
+    settings.DATABASE_PREPARE_THRESHOLD = None
+
+    options = engine_options(settings)
+
+    assert options['poolclass'] is MonitoredQueuePool
+    assert options['pool_size'] == settings.DATABASE_POOL_SIZE
+    assert options['max_overflow'] == settings.DATABASE_MAX_OVERFLOW
+    assert options['pool_recycle'] == settings.DATABASE_POOL_RECYCLE
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args'] == {'prepare_threshold': None}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_connections_get_pragmas(tmp_path):
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path}/app.db')
+    event.listen(engine.sync_engine, 'connect', set_sqlite_pragmas)
+
+    async with engine.connect() as conn:
+        journal_mode = await conn.scalar(text('PRAGMA journal_mode'))
+        foreign_keys = await conn.scalar(text('PRAGMA foreign_keys'))
+
+    await engine.dispose()
+
+    assert journal_mode == 'wal'
+    assert foreign_keys == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_status_reports_checkouts_and_waiters(tmp_path):
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path}/app.db',
+        poolclass=MonitoredQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+
+    async with engine.connect():
+        waiting = asyncio.create_task(engine.connect().start())
+        await asyncio.sleep(0.05)
+        busy = pool_status(engine)
+
+    await (await waiting).close()
+    idle = pool_status(engine)
+    await engine.dispose()
+
+    assert busy['checked_out'] == 1
+    assert busy['waiters'] == 1
+    assert idle['checked_out'] == 0
+    assert idle['waiters'] == 0
+
+
+def test_internal_pool_endpoint(client, settings, monkeypatch, tmp_path):
+    # the app engine's pool depends on DATABASE_URL, so report on our own
+    settings.DATABASE_URL = f'sqlite+aiosqlite:///{tmp_path}/app.db'
+    engine = create_async_engine(
+        settings.DATABASE_URL, **engine_options(settings)
+    )
+    monkeypatch.setattr(
+        'to_do_list.routers.internal.pool_status',
+        partial(pool_status, engine),
+    )
+
+    response = client.get('/internal/pool')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['pool'] == 'MonitoredQueuePool'
+    assert response.json()['waiters'] == 0
@@ -0,0 +1,154 @@
+from http import HTTPStatus
+
+import pytest
+
+from to_do_list.etags import etag_matches, make_etag
+
+
+@pytest.fixture
+def todo_id(client, auth):
+    response = client.post(
+        '/todos/',
+        headers=auth,
+        json={'title': 'Poll me', 'description': 'etag', 'state': 'todo'},
+    )
+    return response.json()['id']
+
+
+def test_etag_matches_lists_weak_tags_and_wildcard():
+    etag = make_etag('a', 1)
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(make_etag('a', 2), etag)
+
+
+def test_list_todos_returns_etag(client, auth, todo_id):
+    response = client.get('/todos/', headers=auth)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'].startswith('"')
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+
+def test_list_todos_not_modified_skips_todo_query(
+    client, auth, todo_id, count_queries
+):
+    # the principal cache answers auth, the version lookup is all that runs
+    expected_queries = 1
+    etag = client.get('/todos/', headers=auth).headers['ETag']
+
+    with count_queries() as queries:
+        response = client.get(
+            '/todos/', headers={**auth, 'If-None-Match': etag}
+        )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+    assert not response.content
+    assert len(queries) == expected_queries
+    assert not any('FROM todos' in query for query in queries)
+
+
+def test_list_todos_etag_depends_on_query_params(client, auth, todo_id):
+    first = client.get('/todos/?limit=1', headers=auth).headers['ETag']
+    second = client.get('/todos/?limit=2', headers=auth).headers['ETag']
+
+    assert first != second
+
+
+def test_list_todos_etag_is_per_user(client, auth, user_2):
+    mine = client.get('/todos/', headers=auth).headers['ETag']
+    other_token = client.post(
+        '/auth/token/',
+        data={'username': user_2.email, 'password': user_2.clean_password},
+    ).json()['access_token']
+
+    response = client.get(
+        '/todos/',
+        headers={
+            'Authorization': f'Bearer {other_token}',
+            'If-None-Match': mine,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_get_todo_returns_etag_and_not_modified(client, auth, todo_id):
+    response = client.get(f'/todos/{todo_id}', headers=auth)
+    etag = response.headers['ETag']
+
+    conditional = client.get(
+        f'/todos/{todo_id}', headers={**auth, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['title'] == 'Poll me'
+    assert conditional.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_get_todo_not_found(client, auth):
+    response = client.get('/todos/10', headers=auth)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'Task not found'}
+
+
+MUTATIONS = {
+    'create': lambda client, auth, todo_id: client.post(
+        '/todos/',
+        headers=auth,
+        json={'title': 'new', 'description': 'new', 'state': 'todo'},
+    ),
+    'patch': lambda client, auth, todo_id: client.patch(
+        f'/todos/{todo_id}', headers=auth, json={'state': 'done'}
+    ),
+    'delete': lambda client, auth, todo_id: client.delete(
+        f'/todos/{todo_id}', headers=auth
+    ),
+    'batch_create': lambda client, auth, todo_id: client.post(
+        '/todos/batch',
+        headers=auth,
+        json={'todos': [{'title': 'new', 'description': 'new'}]},
+    ),
+    'batch_patch': lambda client, auth, todo_id: client.patch(
+        '/todos/batch',
+        headers=auth,
+        json={'todos': [{'id': todo_id, 'state': 'done'}]},
+    ),
+    'batch_delete': lambda client, auth, todo_id: client.request(
+        'DELETE', '/todos/batch', headers=auth, json={'ids': [todo_id]}
+    ),
+}
+
+
+@pytest.mark.parametrize('mutation', MUTATIONS.values(), ids=MUTATIONS)
+def test_todo_writes_invalidate_etags(client, auth, todo_id, mutation):
+    list_etag = client.get('/todos/', headers=auth).headers['ETag']
+    todo_etag = client.get(f'/todos/{todo_id}', headers=auth).headers['ETag']
+
+    assert mutation(client, auth, todo_id).status_code == HTTPStatus.OK
+
+    listed = client.get(
+        '/todos/', headers={**auth, 'If-None-Match': list_etag}
+    )
+    fetched = client.get(
+        f'/todos/{todo_id}', headers={**auth, 'If-None-Match': todo_etag}
+    )
+
+    assert listed.status_code == HTTPStatus.OK
+    assert listed.headers['ETag'] != list_etag
+    assert fetched.status_code != HTTPStatus.NOT_MODIFIED
+
+
+def test_delete_todo_is_committed(client, auth, todo_id):
+    client.delete(f'/todos/{todo_id}', headers=auth)
+
+    response = client.get(f'/todos/{todo_id}', headers=auth)
+    trash = client.get('/todos/?state=trash', headers=auth)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert [todo['id'] for todo in trash.json()['todos']] == [todo_id]
@@ -0,0 +1,166 @@
+import json
+from base64 import urlsafe_b64encode
+from http import HTTPStatus
+
+import pytest
+from jwt import DecodeError, get_unverified_header
+
+from to_do_list.keys import KeyRing
+
+serialization = pytest.importorskip(
+    'cryptography.hazmat.primitives.serialization'
+)
+ec = pytest.importorskip('cryptography.hazmat.primitives.asymmetric.ec')
+ed25519 = pytest.importorskip(
+    'cryptography.hazmat.primitives.asymmetric.ed25519'
+)
+
+
+def _write_key(directory, kid, private_key):
+    (directory / f'{kid}.pem').write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+
+
+@pytest.fixture
+def keys_dir(tmp_path):
+    _write_key(tmp_path, 'ec-1', ec.generate_private_key(ec.SECP256R1()))
+    _write_key(tmp_path, 'ed-1', ed25519.Ed25519PrivateKey.generate())
+    return tmp_path
+
+
+def _ring(settings, keys_dir, active_kid):
+    return KeyRing.from_settings(
+        settings.model_copy(
+            update={
+                'JWT_KEYS_DIR': str(keys_dir),
+                'JWT_ACTIVE_KID': active_kid,
+            }
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    ('kid', 'algorithm'), [('ec-1', 'ES256'), ('ed-1', 'EdDSA')]
+)
+def test_key_ring_signs_with_the_active_key(
+    settings, keys_dir, kid, algorithm
+):
+    ring = _ring(settings, keys_dir, kid)
+
+    token = ring.sign({'sub': 'test@test.com'})
+
+    assert get_unverified_header(token) == {
+        'alg': algorithm,
+        'kid': kid,
+        'typ': 'JWT',
+    }
+    assert ring.verify(token) == {'sub': 'test@test.com'}
+
+
+def test_rotated_out_key_still_verifies_until_removed(settings, keys_dir):
+    token = _ring(settings, keys_dir, 'ec-1').sign({'sub': 'old'})
+
+    rotated = _ring(settings, keys_dir, 'ed-1')
+    (keys_dir / 'ec-1.pem').unlink()
+    retired = _ring(settings, keys_dir, 'ed-1')
+
+    assert rotated.verify(token) == {'sub': 'old'}
+    with pytest.raises(DecodeError, match='Unknown key id'):
+        retired.verify(token)
+
+
+def test_key_ring_keeps_accepting_secret_signed_tokens(settings, keys_dir):
+    legacy = KeyRing.from_settings(settings).sign({'sub': 'legacy'})
+
+    assert _ring(settings, keys_dir, 'ec-1').verify(legacy) == {
+        'sub': 'legacy'
+    }
+
+
+def test_key_ring_can_stop_accepting_secret_signed_tokens(settings, keys_dir):
+    legacy = KeyRing.from_settings(settings).sign({'sub': 'legacy'})
+    settings.JWT_ACCEPT_SECRET_TOKENS = False
+    ring = _ring(settings, keys_dir, 'ec-1')
+
+    with pytest.raises(DecodeError, match='Missing key id'):
+        ring.verify(legacy)
+    assert ring.verify(ring.sign({'sub': 'new'})) == {'sub': 'new'}
+
+
+def test_key_ring_rejects_an_unknown_active_kid(settings, keys_dir):
+    with pytest.raises(ValueError, match='missing'):
+        _ring(settings, keys_dir, 'missing')
+
+
+def test_key_ring_rejects_a_missing_keys_dir(settings, tmp_path):
+    with pytest.raises(ValueError, match='not a directory'):
+        _ring(settings, tmp_path / 'nonexistent', 'k1')
+
+
+def test_key_ring_rejects_an_empty_keys_dir(settings, tmp_path):
+    with pytest.raises(ValueError, match='No \\*.pem signing keys'):
+        _ring(settings, tmp_path, 'k1')
+
+
+def test_key_ring_needs_the_active_kid_among_its_keys():
+    with pytest.raises(ValueError, match='k1'):
+        KeyRing('secret', 'HS256', {}, 'k1')
+
+
+@pytest.mark.parametrize('kid', [['x'], {'k': 'x'}, 1])
+def test_token_with_a_non_string_kid_is_rejected(client, kid):
+    header = json.dumps({'alg': 'HS256', 'kid': kid}).encode()
+    token = f'{urlsafe_b64encode(header).decode().rstrip("=")}.e30.sig'
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_jwks_is_empty_without_asymmetric_keys(client):
+    response = client.get('/.well-known/jwks.json')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'keys': []}
+
+
+def test_jwks_publishes_public_keys_only(
+    client, settings, keys_dir, monkeypatch
+):
+    monkeypatch.setattr(
+        'to_do_list.security.key_ring', _ring(settings, keys_dir, 'ec-1')
+    )
+
+    response = client.get('/.well-known/jwks.json')
+
+    keys = {key['kid']: key for key in response.json()['keys']}
+    assert response.headers['cache-control'] == 'public, max-age=300'
+    assert keys['ec-1']['alg'] == 'ES256'
+    assert keys['ed-1']['alg'] == 'EdDSA'
+    assert not any('d' in key for key in keys.values())
+
+
+def test_login_and_auth_use_the_key_ring(
+    client, user, settings, keys_dir, monkeypatch
+):
+    monkeypatch.setattr(
+        'to_do_list.security.key_ring', _ring(settings, keys_dir, 'ed-1')
+    )
+
+    token = client.post(
+        '/auth/token/',
+        data={'username': user.email, 'password': user.clean_password},
+    ).json()['access_token']
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert get_unverified_header(token)['kid'] == 'ed-1'
+    assert response.status_code == HTTPStatus.OK
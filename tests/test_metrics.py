@@ -0,0 +1,64 @@
+from http import HTTPStatus
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from to_do_list.metrics import MetricsMiddleware, render_family
+
+
+def test_metrics_records_route_template_and_db_queries(client, user, token):
+    client.get(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert (
+        'http_request_duration_seconds_count'
+        '{method="GET",route="/users/{user_id}",status="200"}'
+    ) in response.text
+    assert (
+        'http_request_db_queries_bucket'
+        '{method="GET",route="/users/{user_id}",status="200",le="0"} 0'
+    ) in response.text
+    assert 'principal_cache_requests_total{result="miss"}' in response.text
+    assert 'password_hash_pending 0' in response.text
+
+
+def test_metrics_unmatched_route_is_not_labelled_by_path(client):
+    client.get('/no/such/path/42')
+
+    response = client.get('/metrics')
+
+    assert 'route="unmatched",status="404"' in response.text
+    assert '/no/such/path/42' not in response.text
+
+
+def test_server_timing_header():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, server_timing=True)
+
+    @app.get('/ping')
+    def ping():
+        return {'ok': True}
+
+    response = TestClient(app).get('/ping')
+
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert 'app;dur=' in response.headers['Server-Timing']
+
+
+def test_server_timing_header_is_off_by_default(client):
+    response = client.get('/users/')
+
+    assert 'Server-Timing' not in response.headers
+
+
+def test_render_family_escapes_label_values():
+    lines = render_family(
+        'example', 'gauge', 'Example.', [({'name': 'a"b\\c\n'}, 1)]
+    )
+
+    assert lines[-1] == 'example{name="a\\"b\\\\c\\n"} 1'
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import select
+
+from to_do_list.models import Todo, TodoStateCount
+from to_do_list.purge import purge_stats, purge_trash, run_purge_worker
+
+RETENTION = timedelta(days=30)
+LONG_AGO = datetime(2020, 1, 1)
+
+
+def test_delete_moves_todo_to_trash_and_out_of_listings(
+    client, auth, create_todo
+):
+    kept = create_todo('kept')
+    trashed = create_todo('trashed')
+
+    client.delete(f'/todos/{trashed}', headers=auth)
+
+    listed = client.get('/todos/?count=estimated', headers=auth).json()
+    trash = client.get('/todos/?state=trash', headers=auth).json()
+    assert [todo['id'] for todo in listed['todos']] == [kept]
+    assert listed['total'] == 1
+    assert [todo['id'] for todo in trash['todos']] == [trashed]
+
+
+def test_trashed_todos_are_hidden_from_every_read(client, auth, create_todo):
+    kept = create_todo('kept')
+    trashed = create_todo('trashed')
+    client.delete(f'/todos/{trashed}', headers=auth)
+
+    exported = client.get('/todos/export', headers=auth).text.splitlines()
+    synced = client.get('/todos/changes', headers=auth).json()
+    fetched = client.get(f'/todos/{trashed}', headers=auth)
+    stats = client.get('/todos/stats', headers=auth).json()
+
+    assert [json.loads(line)['id'] for line in exported] == [kept]
+    assert [todo['id'] for todo in synced['todos']] == [kept]
+    assert fetched.status_code == HTTPStatus.NOT_FOUND
+    assert stats['total'] == 1
+    assert stats['counts']['trash'] == 1
+
+
+@pytest.mark.asyncio
+async def test_purge_removes_only_expired_trash(
+    session, client, auth, mock_db_time, create_todo
+):
+    with mock_db_time(model=Todo, time=LONG_AGO):
+        expired = create_todo('expired', state='trash')
+        old = create_todo('old')
+    recent = create_todo('recent')
+    client.delete(f'/todos/{recent}', headers=auth)
+
+    purged = await purge_trash(session.bind, RETENTION, batch_size=10)
+
+    remaining = await session.scalars(select(Todo.id).order_by(Todo.id))
+    remaining = remaining.all()
+    trash = await session.scalar(
+        select(TodoStateCount.count).where(TodoStateCount.state == 'trash')
+    )
+    assert purged == 1
+    assert remaining == [old, recent]
+    assert expired not in remaining
+    assert trash == 1
+
+
+@pytest.mark.asyncio
+async def test_purge_works_in_bounded_batches(
+    session, client, auth, mock_db_time, create_todo
+):
+    expected_purged = 5
+    expected_batches = 3
+    batches = purge_stats.batches
+
+    with mock_db_time(model=Todo, time=LONG_AGO):
+        for number in range(expected_purged):
+            create_todo(f'todo {number}', state='trash')
+
+    purged = await purge_trash(session.bind, RETENTION, batch_size=2)
+
+    assert purged == expected_purged
+    assert purge_stats.batches - batches == expected_batches
+    assert not (await session.scalars(select(Todo))).all()
+
+
+@pytest.mark.asyncio
+async def test_purge_worker_survives_a_failed_run(monkeypatch, settings):
+    expected_runs = 2
+    failures = purge_stats.failures
+    runs = []
+
+    async def purge(*args):
+        runs.append(args)
+
+        if len(runs) == 1:
+            raise RuntimeError('database went away')
+
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr('to_do_list.purge.purge_trash', purge)
+    settings.TRASH_PURGE_INTERVAL_SECONDS = 0
+
+    with pytest.raises(asyncio.CancelledError):
+        await run_purge_worker(None, settings)
+
+    assert len(runs) == expected_runs
+    assert purge_stats.failures == failures + 1
+
+
+def test_metrics_report_purge_progress(client):
+    response = client.get('/metrics')
+
+    assert 'trash_purge_runs_total{outcome="ok"}' in response.text
+    assert 'trash_purged_todos_total' in response.text
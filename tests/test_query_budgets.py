@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import select
+
+from tests.conftest import QUERY_BUDGETS, _app_routes
+from to_do_list.models import User
+
+
+def test_every_budget_names_a_route():
+    routes = {
+        (method, route.path)
+        for route in _app_routes()
+        for method in getattr(route, 'methods', None) or ()
+    }
+
+    assert set(QUERY_BUDGETS) <= routes
+
+
+@pytest.mark.asyncio
+async def test_query_budget_reports_the_offending_sql(session, query_budget):
+    with pytest.raises(AssertionError) as error:
+        with query_budget(0):
+            await session.scalar(select(User).where(User.id == 1))
+
+    assert 'ran 1 queries, over its budget of 0' in str(error.value)
+    assert 'ms] SELECT users.id' in str(error.value)
+
+
+def test_client_checks_endpoint_budgets(client, user, monkeypatch):
+    monkeypatch.setitem(QUERY_BUDGETS, ('GET', '/users/{user_id}'), 0)
+
+    with pytest.raises(AssertionError, match='GET /users/{user_id} ran 1'):
+        client.get(f'/users/{user.id}')
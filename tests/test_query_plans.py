@@ -0,0 +1,135 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from to_do_list.models import Todo, TodoState, TodoTombstone, User
+from to_do_list.purge import expired_trash_query
+from to_do_list.schemas import FilterStats
+from to_do_list.search import search_todos
+from to_do_list.stats import bucketed_counts_query
+
+
+@pytest.mark.asyncio
+async def test_list_todos_uses_user_index(session, explain):
+    plan = await explain(
+        session,
+        select(Todo).where(Todo.user_id == 1).order_by(Todo.id).limit(11),
+    )
+
+    assert 'USING INDEX ix_todos_user_id_id' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.asyncio
+async def test_list_todos_cursor_page_uses_user_index(session, explain):
+    last_seen_id = 500
+    plan = await explain(
+        session,
+        select(Todo)
+        .where(Todo.user_id == 1, Todo.id > last_seen_id)
+        .order_by(Todo.id)
+        .limit(11),
+    )
+
+    assert 'USING INDEX ix_todos_user_id_id (user_id=? AND id>?)' in plan
+
+
+@pytest.mark.asyncio
+async def test_list_todos_by_state_uses_state_index(session, explain):
+    plan = await explain(
+        session,
+        select(Todo)
+        .where(Todo.user_id == 1, Todo.state == TodoState.done)
+        .order_by(Todo.id)
+        .limit(11),
+    )
+
+    assert 'USING INDEX ix_todos_user_id_state (user_id=? AND state=?)' in plan
+
+
+@pytest.mark.asyncio
+async def test_single_todo_lookup_uses_primary_key(session, explain):
+    plan = await explain(
+        session, select(Todo).where(Todo.id == 1, Todo.user_id == 1)
+    )
+
+    assert 'USING INTEGER PRIMARY KEY (rowid=?)' in plan
+
+
+def test_search_todos_matches_prefixes_on_postgresql():
+    query = search_todos(select(Todo), 'milk "the-cows', 'postgresql')
+    compiled = query.compile(dialect=postgresql.dialect())
+
+    assert "to_tsquery('simple', %(to_tsquery_1)s" in str(compiled)
+    assert compiled.params['to_tsquery_1'] == 'milk:* & the:* & cows:*'
+
+
+@pytest.mark.asyncio
+async def test_user_todos_load_uses_user_index(session, explain):
+    plan = await explain(session, select(Todo).where(Todo.user_id.in_([1, 2])))
+
+    assert 'SCAN todos' not in plan
+    assert 'ix_todos_user_id' in plan
+
+
+@pytest.mark.asyncio
+async def test_current_user_lookup_uses_email_index(session, explain):
+    plan = await explain(
+        session, select(User).where(User.email == 'test@test.com')
+    )
+
+    assert 'USING INDEX sqlite_autoindex_users' in plan
+
+
+@pytest.mark.asyncio
+async def test_search_todos_uses_full_text_index(session, explain):
+    plan = await explain(
+        session,
+        search_todos(select(Todo).where(Todo.user_id == 1), 'milk', 'sqlite'),
+    )
+
+    assert 'SCAN todos_fts VIRTUAL TABLE INDEX' in plan
+    assert 'USING INTEGER PRIMARY KEY (rowid=?)' in plan
+
+
+@pytest.mark.asyncio
+async def test_todo_changes_use_version_indexes(session, explain):
+    since_version = 40
+    changed = await explain(
+        session,
+        select(Todo)
+        .where(Todo.user_id == 1, Todo.version > since_version)
+        .order_by(Todo.version, Todo.id),
+    )
+    deleted = await explain(
+        session,
+        select(TodoTombstone.todo_id).where(
+            TodoTombstone.user_id == 1, TodoTombstone.version > since_version
+        ),
+    )
+
+    assert 'ix_todos_user_id_version (user_id=? AND version>?)' in changed
+    assert 'TEMP B-TREE' not in changed
+    assert 'ix_todo_tombstones_user_id_version' in deleted
+
+
+@pytest.mark.asyncio
+async def test_todo_stats_buckets_scan_only_the_users_rows(session, explain):
+    plan = await explain(
+        session,
+        bucketed_counts_query(1, FilterStats(bucket='day'), 'sqlite'),
+    )
+
+    assert 'USING INDEX ix_todos_user_id_' in plan
+    assert '(user_id=?)' in plan
+
+
+@pytest.mark.asyncio
+async def test_trash_purge_uses_state_updated_at_index(session, explain):
+    plan = await explain(
+        session, expired_trash_query(datetime(2026, 1, 1), batch_size=500)
+    )
+
+    assert 'ix_todos_state_updated_at (state=? AND updated_at<?)' in plan
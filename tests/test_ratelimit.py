@@ -0,0 +1,160 @@
+from http import HTTPStatus
+
+import pytest
+from freezegun import freeze_time
+
+from to_do_list.ratelimit import LoginLimiter, MemoryRateLimitBackend
+
+
+def _login(client, username, password):
+    return client.post(
+        '/auth/token/', data={'username': username, 'password': password}
+    )
+
+
+def _limit(login_limiter, settings, **update):
+    login_limiter.settings = settings.model_copy(update=update)
+
+
+def test_login_is_limited_per_username_before_any_query(
+    client, user, login_limiter, settings, count_queries
+):
+    _limit(login_limiter, settings, LOGIN_USERNAME_BURST=2)
+    _login(client, user.email, 'wrong')
+    _login(client, user.email, 'wrong')
+
+    with count_queries() as queries:
+        response = _login(client, user.email, user.clean_password)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.json() == {'detail': 'Too many login attempts'}
+    assert int(response.headers['Retry-After']) > 0
+    assert queries == []
+    assert login_limiter.rejected['username'] == 1
+
+
+def test_login_is_limited_per_client_ip(client, user, login_limiter, settings):
+    _limit(login_limiter, settings, LOGIN_IP_BURST=2)
+    _login(client, 'a@test.com', 'wrong')
+    _login(client, 'b@test.com', 'wrong')
+
+    response = _login(client, user.email, user.clean_password)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert login_limiter.rejected['ip'] == 1
+
+
+def test_usernames_are_limited_case_insensitively(
+    client, user, login_limiter, settings
+):
+    _limit(login_limiter, settings, LOGIN_USERNAME_BURST=1)
+    _login(client, user.email, 'wrong')
+
+    response = _login(client, user.email.upper(), 'wrong')
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+
+def test_repeated_failures_lock_the_username_out(
+    client, user, login_limiter, settings
+):
+    _limit(login_limiter, settings, LOGIN_LOCKOUT_FAILURES=2)
+    _login(client, user.email, 'wrong')
+    _login(client, user.email, 'wrong')
+
+    response = _login(client, user.email, user.clean_password)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert login_limiter.rejected['lockout'] == 1
+    assert login_limiter.lockouts == 1
+
+
+def test_successful_login_resets_the_failure_count(
+    client, user, login_limiter, settings
+):
+    _limit(login_limiter, settings, LOGIN_LOCKOUT_FAILURES=2)
+    _login(client, user.email, 'wrong')
+    _login(client, user.email, user.clean_password)
+    _login(client, user.email, 'wrong')
+
+    response = _login(client, user.email, user.clean_password)
+
+    assert response.status_code == HTTPStatus.OK
+    assert login_limiter.lockouts == 0
+
+
+def test_rate_limit_can_be_turned_off(client, user, login_limiter, settings):
+    _limit(
+        login_limiter,
+        settings,
+        LOGIN_RATE_LIMIT_ENABLED=False,
+        LOGIN_USERNAME_BURST=1,
+    )
+    _login(client, user.email, 'wrong')
+
+    response = _login(client, user.email, user.clean_password)
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_metrics_count_rate_limited_logins(
+    client, user, login_limiter, settings
+):
+    _limit(login_limiter, settings, LOGIN_USERNAME_BURST=1)
+    _login(client, user.email, 'wrong')
+    _login(client, user.email, 'wrong')
+
+    response = client.get('/metrics')
+
+    assert 'login_rate_limited_total{reason="username"} 1' in response.text
+    assert 'login_lockouts_total 0' in response.text
+
+
+@pytest.mark.asyncio
+async def test_lockouts_back_off_up_to_the_maximum(settings):
+    expected_lockouts = (60, 120, 150)
+    limiter = LoginLimiter(
+        MemoryRateLimitBackend(maxsize=10),
+        settings.model_copy(
+            update={
+                'LOGIN_LOCKOUT_FAILURES': 1,
+                'LOGIN_LOCKOUT_SECONDS': 60,
+                'LOGIN_LOCKOUT_BACKOFF': 2,
+                'LOGIN_LOCKOUT_MAX_SECONDS': 150,
+            }
+        ),
+    )
+
+    with freeze_time('2026-01-01 12:00:00') as frozen:
+        for expected in expected_lockouts:
+            await limiter.failed('user')
+
+            assert await limiter.check('ip', 'user') == expected
+
+            frozen.tick(expected)
+
+        assert await limiter.check('ip', 'user') == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_refills_tokens_over_time():
+    backend = MemoryRateLimitBackend(maxsize=10)
+
+    with freeze_time('2026-01-01 12:00:00') as frozen:
+        assert await backend.take('key', 1, 0.5) == 0
+        assert await backend.take('key', 1, 0.5) == pytest.approx(2)
+
+        frozen.tick(2)
+
+        assert await backend.take('key', 1, 0.5) == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_is_bounded():
+    backend = MemoryRateLimitBackend(maxsize=2)
+
+    for key in ('a', 'b', 'c'):
+        await backend.set(key, 1, ttl=60)
+
+    assert await backend.get('a') is None
+    assert await backend.get('c') == 1
@@ -1,9 +1,21 @@
+import asyncio
+import threading
 from http import HTTPStatus
 
+import pytest
 from freezegun import freeze_time
 from jwt import decode
+from sqlalchemy import update
 
-from to_do_list.security import create_access_token
+from to_do_list.models import User
+from to_do_list.security import (
+    PasswordHashPool,
+    create_access_token,
+    get_password_hash,
+    get_password_hash_async,
+    verify_password,
+    verify_password_async,
+)
 
 
 def test_jwt(settings):
@@ -54,3 +66,216 @@ def test_token_expired_after_time(client, user):
 
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_current_user_is_served_from_principal_cache(
+    client, user, token, principal_cache, count_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/users/', headers=headers)
+
+    with count_queries() as queries:
+        response = client.get('/users/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert principal_cache.misses == 1
+    assert principal_cache.hits == 1
+    assert not any('WHERE users.email' in query for query in queries)
+
+
+def test_access_token_carries_user_id_and_token_version(settings, user, token):
+    claims = decode(
+        token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+
+    assert claims['sub'] == user.email
+    assert claims['uid'] == user.id
+    assert claims['ver'] == user.token_version
+
+
+def test_current_user_is_looked_up_by_primary_key(
+    client, user, token, count_queries
+):
+    with count_queries() as queries:
+        response = client.get(
+            '/users/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert any('WHERE users.id = ' in query for query in queries)
+    assert not any('WHERE users.email' in query for query in queries)
+
+
+def test_token_without_user_claims_is_rejected(client, user):
+    token = create_access_token({'sub': user.email})
+
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_update_user_revokes_older_tokens(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/users/', headers=headers)
+
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': 'new_password',
+        },
+    )
+    stale = client.get('/users/', headers=headers)
+    new_token = client.post(
+        '/auth/token/',
+        data={'username': user.email, 'password': 'new_password'},
+    ).json()['access_token']
+    fresh = client.get(
+        '/users/', headers={'Authorization': f'Bearer {new_token}'}
+    )
+
+    assert stale.status_code == HTTPStatus.UNAUTHORIZED
+    assert fresh.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_credential_changes_skip_a_stale_principal_cache(
+    session, client, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/users/', headers=headers)
+    # revoked on another worker, whose cache this one does not see
+    await session.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(token_version=User.token_version + 1)
+    )
+    await session.commit()
+
+    cached = client.get('/users/', headers=headers)
+    response = client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': 'new_password',
+        },
+    )
+
+    assert cached.status_code == HTTPStatus.OK
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_claims_only_reads_skip_the_user_lookup(
+    client, user, token, count_queries, monkeypatch
+):
+    monkeypatch.setattr('to_do_list.security.settings.AUTH_CLAIMS_ONLY', True)
+
+    with count_queries() as queries:
+        response = client.get(
+            '/todos/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert not any('users.password' in query for query in queries)
+
+
+def test_claims_only_writes_still_check_the_database(
+    client, user, token, monkeypatch
+):
+    monkeypatch.setattr('to_do_list.security.settings.AUTH_CLAIMS_ONLY', True)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    client.delete(f'/users/{user.id}', headers=headers)
+    read = client.get('/todos/', headers=headers)
+    write = client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 't', 'description': 'd', 'state': 'todo'},
+    )
+
+    # reads trust the token until it expires, writes see the revocation
+    assert read.status_code == HTTPStatus.OK
+    assert write.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_update_user_invalidates_principal_cache(
+    client, user, token, principal_cache
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/users/', headers=headers)
+
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': 'new_password',
+        },
+    )
+
+    assert len(principal_cache) == 0
+
+
+def test_delete_user_invalidates_principal_cache(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/users/', headers=headers)
+
+    client.delete(f'/users/{user.id}', headers=headers)
+    response = client.get('/users/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_password_hash_async_round_trip():
+    hashed = await get_password_hash_async('secret')
+
+    assert await verify_password_async('secret', hashed)
+    assert not await verify_password_async('wrong', hashed)
+
+
+@pytest.mark.asyncio
+async def test_password_hash_pool_runs_off_the_event_loop_thread():
+    pool = PasswordHashPool(executor='thread', max_workers=1)
+
+    worker_thread = await pool.run(threading.get_ident)
+    pool.shutdown()
+
+    assert worker_thread != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_password_hash_pool_supports_process_executor():
+    pool = PasswordHashPool(executor='process', max_workers=1)
+
+    hashed = await pool.run(get_password_hash, 'secret')
+    pool.shutdown()
+
+    assert verify_password('secret', hashed)
+
+
+@pytest.mark.asyncio
+async def test_password_hash_pool_reports_queue_depth():
+    expected_pending = 3
+    pool = PasswordHashPool(executor='thread', max_workers=1)
+    release = threading.Event()
+
+    tasks = [asyncio.create_task(pool.run(release.wait)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    assert pool.pending == expected_pending
+    assert pool.queue_depth == expected_pending - 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    pool.shutdown()
+
+    assert pool.pending == 0
+    assert pool.queue_depth == 0
@@ -0,0 +1,131 @@
+from datetime import datetime
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import func, select
+
+from to_do_list.models import Todo, TodoStateCount
+
+
+async def _live_counts(session):
+    rows = await session.execute(
+        select(Todo.state, func.count()).group_by(Todo.state)
+    )
+    return {state.value: count for state, count in rows}
+
+
+async def _kept_counts(session):
+    rows = await session.execute(
+        select(TodoStateCount.state, TodoStateCount.count).where(
+            TodoStateCount.count != 0
+        )
+    )
+    return {state.value: count for state, count in rows}
+
+
+def test_stats_counts_todos_per_state(client, auth, create_todo):
+    expected_total = 3
+    create_todo(state='todo')
+    create_todo(state='todo')
+    create_todo(state='done')
+
+    response = client.get('/todos/stats', headers=auth)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'total': expected_total,
+        'counts': {'draft': 0, 'todo': 2, 'doing': 0, 'done': 1, 'trash': 0},
+        'buckets': None,
+    }
+
+
+def test_stats_reads_the_counter_table_only(
+    client, auth, count_queries, create_todo
+):
+    create_todo(state='todo')
+
+    with count_queries() as queries:
+        client.get('/todos/stats', headers=auth)
+
+    assert len(queries) == 1
+    assert 'FROM todo_state_counts' in queries[0]
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_every_mutation_path(
+    session, client, auth, create_todo
+):
+    first = create_todo(state='draft')
+    second = create_todo(state='todo')
+    third = create_todo(state='todo')
+    client.post(
+        '/todos/batch',
+        headers=auth,
+        json={
+            'todos': [
+                {'title': 'a', 'description': 'a', 'state': 'doing'},
+                {'title': 'b', 'description': 'b', 'state': 'doing'},
+            ]
+        },
+    )
+    client.patch(f'/todos/{first}', headers=auth, json={'state': 'done'})
+    client.patch(f'/todos/{first}', headers=auth, json={'title': 'renamed'})
+    client.patch(
+        '/todos/batch',
+        headers=auth,
+        json={
+            'todos': [
+                {'id': second, 'state': 'trash'},
+                {'id': third, 'state': 'trash'},
+                {'id': 999, 'state': 'trash'},
+            ]
+        },
+    )
+    client.delete(f'/todos/{second}', headers=auth)
+    client.request(
+        'DELETE', '/todos/batch', headers=auth, json={'ids': [third, 999]}
+    )
+    client.post(
+        '/todos/import',
+        headers=auth,
+        content=b'{"title": "i", "description": "i", "state": "draft"}\n',
+    )
+
+    assert await _kept_counts(session) == await _live_counts(session)
+    assert await _live_counts(session) == {
+        'done': 1,
+        'doing': 2,
+        'draft': 1,
+        'trash': 2,
+    }
+
+
+BUCKET_STARTS = {
+    'day': ['2026-03-02', '2026-03-08', '2026-03-31'],
+    'week': ['2026-03-02', '2026-03-30'],
+    'month': ['2026-03-01'],
+}
+
+
+@pytest.mark.parametrize('bucket', BUCKET_STARTS)
+def test_stats_buckets_by_created_at(
+    client, auth, mock_db_time, create_todo, bucket
+):
+    expected_done = 2
+    sunday = 8
+    # a Monday, the Sunday closing that week, and a Tuesday
+    for day in (2, sunday, sunday, 31):
+        with mock_db_time(model=Todo, time=datetime(2026, 3, day, 10)):
+            create_todo(state='done' if day == sunday else 'todo')
+
+    response = client.get(f'/todos/stats?bucket={bucket}', headers=auth)
+
+    buckets = response.json()['buckets']
+    assert [item['start'] for item in buckets] == BUCKET_STARTS[bucket]
+    assert sum(item['counts']['done'] for item in buckets) == expected_done
+
+
+def test_stats_rejects_unknown_bucket(client, auth):
+    response = client.get('/todos/stats?bucket=year', headers=auth)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
@@ -0,0 +1,244 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from time import time
+
+import pytest
+from sqlalchemy import select
+
+from to_do_list.models import TodoTombstone
+from to_do_list.pagination import decode_token, encode_token
+from to_do_list.purge import prune_tombstones, purge_batch
+
+# every trashed todo has expired by then
+FAR_FUTURE = datetime(2100, 1, 1)
+
+
+def _changes(client, auth, since=None):
+    params = {} if since is None else {'since': since}
+    response = client.get('/todos/changes', headers=auth, params=params)
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+def _version(token):
+    # tokens also carry when they were issued, so compare versions only
+    return decode_token(token, 'v', 'Invalid sync token')
+
+
+def test_first_sync_returns_every_todo(client, auth, create_todo):
+    first = create_todo('first')
+    second = create_todo('second')
+
+    changes = _changes(client, auth)
+
+    assert [todo['id'] for todo in changes['todos']] == [first, second]
+    assert changes['deleted'] == []
+    assert changes['sync_token']
+
+
+def test_sync_without_writes_is_empty(client, auth, create_todo):
+    create_todo('first')
+    token = _changes(client, auth)['sync_token']
+
+    changes = _changes(client, auth, token)
+
+    assert changes['todos'] == []
+    assert changes['deleted'] == []
+    assert changes['has_more'] is False
+    assert _version(changes['sync_token']) == _version(token)
+
+
+def test_sync_returns_only_changes_since_token(client, auth, create_todo):
+    untouched = create_todo('untouched')
+    trashed = create_todo('trashed')
+    patched = create_todo('patched')
+    token = _changes(client, auth)['sync_token']
+
+    client.patch(f'/todos/{patched}', headers=auth, json={'state': 'done'})
+    client.delete(f'/todos/{trashed}', headers=auth)
+    created = create_todo('created')
+
+    changes = _changes(client, auth, token)
+
+    assert [todo['id'] for todo in changes['todos']] == [
+        patched,
+        trashed,
+        created,
+    ]
+    assert [todo['state'] for todo in changes['todos']] == [
+        'done',
+        'trash',
+        'todo',
+    ]
+    assert untouched not in [todo['id'] for todo in changes['todos']]
+    assert changes['deleted'] == []
+    assert changes['sync_token'] != token
+
+
+def test_sync_follows_batch_writes(client, auth, create_todo):
+    ids = [create_todo(f'todo {number}') for number in range(3)]
+    token = _changes(client, auth)['sync_token']
+
+    client.patch(
+        '/todos/batch',
+        headers=auth,
+        json={'todos': [{'id': ids[0], 'title': 'renamed'}]},
+    )
+    client.request(
+        'DELETE', '/todos/batch', headers=auth, json={'ids': ids[1:]}
+    )
+
+    changes = _changes(client, auth, token)
+
+    assert [todo['title'] for todo in changes['todos']] == [
+        'renamed',
+        'todo 1',
+        'todo 2',
+    ]
+    assert [todo['state'] for todo in changes['todos'][1:]] == ['trash'] * 2
+
+
+@pytest.mark.asyncio
+async def test_sync_reports_purged_todos_as_deleted(
+    session, client, auth, create_todo
+):
+    trashed = create_todo('trashed')
+    client.delete(f'/todos/{trashed}', headers=auth)
+    token = _changes(client, auth)['sync_token']
+
+    await purge_batch(session, FAR_FUTURE, batch_size=10)
+
+    changes = _changes(client, auth, token)
+
+    assert changes['todos'] == []
+    assert changes['deleted'] == [trashed]
+    assert _version(changes['sync_token']) == _version(
+        _changes(client, auth)['sync_token']
+    )
+
+
+@pytest.mark.asyncio
+async def test_sync_only_sees_own_tombstones(
+    session, client, auth, user_2, create_todo
+):
+    other_token = client.post(
+        '/auth/token/',
+        data={'username': user_2.email, 'password': user_2.clean_password},
+    ).json()['access_token']
+    other_auth = {'Authorization': f'Bearer {other_token}'}
+    token = _changes(client, auth)['sync_token']
+
+    client.delete(
+        f'/todos/{create_todo("theirs", headers=other_auth)}',
+        headers=other_auth,
+    )
+    await purge_batch(session, FAR_FUTURE, batch_size=10)
+
+    assert _changes(client, auth, token)['deleted'] == []
+
+
+def test_sync_rejects_invalid_token(client, auth):
+    response = client.get(
+        '/todos/changes', headers=auth, params={'since': 'not-a-token'}
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid sync token'}
+
+
+@pytest.mark.asyncio
+async def test_sync_does_not_delete_a_reused_id(
+    session, client, auth, create_todo
+):
+    last = create_todo('last')
+    client.delete(f'/todos/{last}', headers=auth)
+    token = _changes(client, auth)['sync_token']
+
+    await purge_batch(session, FAR_FUTURE, batch_size=10)
+    create_todo('replacement')
+
+    changes = _changes(client, auth, token)
+
+    assert [todo['title'] for todo in changes['todos']] == ['replacement']
+    assert set(changes['deleted']).isdisjoint(
+        todo['id'] for todo in changes['todos']
+    )
+
+
+def _sync_all(client, auth, since=None, limit=1):
+    pages = []
+
+    while True:
+        params = {'limit': limit, **({'since': since} if since else {})}
+        response = client.get('/todos/changes', headers=auth, params=params)
+        pages.append(response.json())
+        since = pages[-1]['sync_token']
+
+        if not pages[-1]['has_more']:
+            return pages
+
+
+def test_first_sync_comes_in_pages(client, auth, create_todo):
+    ids = [create_todo(f'todo {number}') for number in range(3)]
+
+    pages = _sync_all(client, auth, limit=2)
+
+    assert [[todo['id'] for todo in page['todos']] for page in pages] == [
+        ids[:2],
+        ids[2:],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sync_pages_through_todos_and_tombstones(
+    session, client, auth, create_todo
+):
+    purged, kept = create_todo('purged'), create_todo('kept')
+    token = _changes(client, auth)['sync_token']
+    client.delete(f'/todos/{purged}', headers=auth)
+    await purge_batch(session, FAR_FUTURE, batch_size=10)
+    client.patch(f'/todos/{kept}', headers=auth, json={'state': 'done'})
+    created = create_todo('created')
+
+    pages = _sync_all(client, auth, token)
+
+    assert [
+        (page['deleted'], [todo['id'] for todo in page['todos']])
+        for page in pages
+    ] == [([purged], []), ([], [kept]), ([], [created])]
+    assert _version(pages[-1]['sync_token']) == _version(
+        _changes(client, auth)['sync_token']
+    )
+
+
+def test_sync_token_past_the_tombstone_retention_is_gone(
+    client, auth, settings
+):
+    expired = encode_token({
+        'v': 0,
+        't': int(time() - settings.SYNC_TOMBSTONE_RETENTION_DAYS * 86400) - 60,
+    })
+
+    for since in (expired, encode_token({'v': 0})):
+        response = client.get(
+            '/todos/changes', headers=auth, params={'since': since}
+        )
+
+        assert response.status_code == HTTPStatus.GONE
+
+
+@pytest.mark.asyncio
+async def test_prune_tombstones_keeps_recent_ones(session, user):
+    old = TodoTombstone(todo_id=1, version=1, user_id=user.id)
+    old.deleted_at = datetime(2020, 1, 1)
+    session.add_all([
+        old,
+        TodoTombstone(todo_id=2, version=2, user_id=user.id),
+    ])
+    await session.commit()
+
+    pruned = await prune_tombstones(session.bind, timedelta(days=90), 1)
+
+    remaining = await session.scalars(select(TodoTombstone.todo_id))
+    assert pruned == 1
+    assert remaining.all() == [2]
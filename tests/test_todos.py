@@ -1,21 +1,12 @@
 from http import HTTPStatus
 
-import factory
-import factory.fuzzy
 import pytest
 from sqlalchemy import select
 
+from tests.conftest import TodoFactory
 from to_do_list.models import Todo, TodoState, User
-
-
-class TodoFactory(factory.Factory):
-    class Meta:
-        model = Todo
-
-    title = factory.Faker('text')
-    description = factory.Faker('text')
-    state = factory.fuzzy.FuzzyChoice(TodoState)
-    user_id = 1
+from to_do_list.pagination import encode_cursor, paginate
+from to_do_list.schemas import FilterTodo, TodoList, TodoPublic
 
 
 def test_create_todo(client, token, mock_db_time):
@@ -43,6 +34,24 @@ def test_create_todo(client, token, mock_db_time):
     }
 
 
+def test_create_todo_runs_a_single_insert(client, token, count_queries):
+    expected_queries = 4
+
+    with count_queries() as queries:
+        response = client.post(
+            '/todos/',
+            json={'title': 'Test todo', 'description': 'Description test'},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert len(queries) == expected_queries
+    assert queries[1].startswith('UPDATE users SET')
+    assert queries[-1].startswith('INSERT INTO todos')
+    assert 'RETURNING' in queries[-1]
+    assert response.json()['created_at']
+    assert response.json()['updated_at']
+
+
 @pytest.mark.asyncio
 async def test_list_todos_should_return_5_todos(session, client, user, token):
     expected_todos = 5
@@ -57,6 +66,20 @@ async def test_list_todos_should_return_5_todos(session, client, user, token):
     assert len(response.json()['todos']) == expected_todos
 
 
+@pytest.mark.asyncio
+async def test_list_todos_reads_version_and_todos_after_auth(
+    session, client, user, token, count_queries
+):
+    expected_queries = 3
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as queries:
+        client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    assert len(queries) == expected_queries
+
+
 @pytest.mark.asyncio
 async def test_list_todos_pagination_should_return_2_todos(
     session, user, client, token
@@ -73,6 +96,206 @@ async def test_list_todos_pagination_should_return_2_todos(
     assert len(response.json()['todos']) == expected_todos
 
 
+@pytest.mark.asyncio
+async def test_list_todos_cursor_pagination_walks_every_todo(
+    session, user, client, token
+):
+    expected_todos = 5
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    seen = []
+    url = '/todos/?limit=2'
+    while url:
+        response = client.get(
+            url, headers={'Authorization': f'Bearer {token}'}
+        )
+        seen.extend(todo['id'] for todo in response.json()['todos'])
+        next_cursor = response.json()['next_cursor']
+        url = next_cursor and f'/todos/?limit=2&cursor={next_cursor}'
+
+    assert len(seen) == expected_todos
+    assert seen == sorted(set(seen))
+
+
+@pytest.mark.asyncio
+async def test_list_todos_last_page_has_no_next_cursor(
+    session, user, client, token
+):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/?limit=2',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['next_cursor'] is None
+
+
+@pytest.mark.asyncio
+async def test_list_todos_has_more_follows_the_extra_row(
+    session, user, client, token
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    auth = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos/?limit=2', headers=auth).json()
+    last = client.get('/todos/?limit=3', headers=auth).json()
+
+    assert first['has_more'] is True
+    assert first['total'] is None
+    assert last['has_more'] is False
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_reports_has_more(
+    session, user, client, token
+):
+    expected_todos = 2
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, description='milk')
+    )
+    await session.commit()
+
+    response = client.get(
+        '/todos/?q=milk&limit=2',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert len(response.json()['todos']) == expected_todos
+    assert response.json()['has_more'] is True
+
+
+def _create_todos(client, token, titles, state='todo'):
+    client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'todos': [
+                {'title': title, 'description': 'count', 'state': state}
+                for title in titles
+            ]
+        },
+    )
+
+
+def test_list_todos_exact_total_counts_every_match(
+    client, token, count_queries
+):
+    expected_total = 3
+    _create_todos(client, token, ['milk 1', 'milk 2', 'milk 3', 'bread'])
+
+    with count_queries() as queries:
+        response = client.get(
+            '/todos/?title=milk&limit=1&count=exact',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.json()['total'] == expected_total
+    assert response.json()['has_more'] is True
+    assert 'count(*)' in queries[-1]
+
+
+def test_list_todos_estimated_total_reads_the_counters(
+    client, token, count_queries
+):
+    expected_total = 2
+    _create_todos(client, token, ['a', 'b'], state='doing')
+    _create_todos(client, token, ['c'], state='done')
+
+    with count_queries() as queries:
+        response = client.get(
+            '/todos/?state=doing&limit=1&count=estimated',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.json()['total'] == expected_total
+    assert 'FROM todo_state_counts' in queries[-1]
+
+
+def test_list_todos_estimated_total_is_cached_until_a_write(
+    client, token, count_queries
+):
+    expected_total = 3
+    auth = {'Authorization': f'Bearer {token}'}
+    url = '/todos/?title=milk&limit=1&count=estimated'
+    _create_todos(client, token, ['milk 1', 'milk 2'])
+    client.get(url, headers=auth)
+
+    with count_queries() as queries:
+        cached = client.get(f'{url}&offset=1', headers=auth).json()
+
+    _create_todos(client, token, ['milk 3'])
+    fresh = client.get(url, headers=auth).json()
+
+    assert cached['total'] == expected_total - 1
+    assert not [query for query in queries if 'count(*)' in query]
+    assert fresh['total'] == expected_total
+
+
+def test_list_todos_invalid_cursor(client, token):
+    response = client.get(
+        '/todos/?cursor=not-a-cursor',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+async def _count_vm_steps(session, query):
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    steps = 0
+
+    def progress():
+        nonlocal steps
+        steps += 1
+        return 0
+
+    await raw_connection.driver_connection.set_progress_handler(progress, 10)
+    (await session.scalars(query)).all()
+    await raw_connection.driver_connection.set_progress_handler(None, 10)
+
+    return steps
+
+
+async def _deep_page_cost(session, user, page_filter):
+    last = await session.scalar(select(Todo.id).order_by(Todo.id.desc()))
+    cursor_page = page_filter.model_copy(
+        update={'cursor': encode_cursor(last - 10)}
+    )
+    offset_page = page_filter.model_copy(update={'offset': last - 10})
+    query = select(Todo).where(Todo.user_id == user.id)
+
+    return (
+        await _count_vm_steps(session, paginate(query, Todo.id, cursor_page)),
+        await _count_vm_steps(session, paginate(query, Todo.id, offset_page)),
+    )
+
+
+@pytest.mark.asyncio
+async def test_cursor_page_cost_does_not_grow_with_table(session, user):
+    page_filter = FilterTodo(limit=10)
+
+    session.add_all(TodoFactory.create_batch(100, user_id=user.id))
+    await session.commit()
+    small_cursor, small_offset = await _deep_page_cost(
+        session, user, page_filter
+    )
+
+    session.add_all(TodoFactory.create_batch(2000, user_id=user.id))
+    await session.commit()
+    large_cursor, large_offset = await _deep_page_cost(
+        session, user, page_filter
+    )
+
+    assert large_cursor <= small_cursor * 1.5
+    assert large_offset > small_offset * 10
+
+
 @pytest.mark.asyncio
 async def test_list_todos_filter_by_title_should_return_1_todo(
     session, user, client, token
@@ -133,6 +356,102 @@ async def test_list_todos_filter_by_description_should_return_1_todo(
     assert response.json()['todos'][0]['description'] == 'Unique Description'
 
 
+@pytest.mark.asyncio
+async def test_list_todos_search_ranks_matches(session, user, client, token):
+    session.add_all([
+        TodoFactory(user_id=user.id, title='Groceries', description='milk'),
+        TodoFactory(
+            user_id=user.id, title='Milk the cows', description='milk milk'
+        ),
+        TodoFactory(user_id=user.id, title='Laundry', description='shirts'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?q=milk',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert [todo['title'] for todo in response.json()['todos']] == [
+        'Milk the cows',
+        'Groceries',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_matches_prefixes_and_all_terms(
+    session, user, client, token
+):
+    session.add_all([
+        TodoFactory(user_id=user.id, title='Call plumber', description='x'),
+        TodoFactory(user_id=user.id, title='Call mom', description='y'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?q=call%20plumb',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert [todo['title'] for todo in response.json()['todos']] == [
+        'Call plumber'
+    ]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_ignores_query_syntax(
+    session, user, client, token
+):
+    session.add(TodoFactory(user_id=user.id, title='Taxes', description='x'))
+    await session.commit()
+
+    response = client.get(
+        '/todos/?q=%22tax-*',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['title'] for todo in response.json()['todos']] == ['Taxes']
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_follows_updates_and_deletes(
+    session, user, user_2, client, token
+):
+    todo = TodoFactory(user_id=user.id, title='Old title', description='x')
+    gone = TodoFactory(user_id=user.id, title='Old gone', description='x')
+    other = TodoFactory(user_id=user_2.id, title='Old other', description='x')
+    session.add_all([todo, gone, other])
+    await session.commit()
+
+    client.patch(
+        f'/todos/{todo.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'New title'},
+    )
+    await session.delete(gone)
+    await session.commit()
+
+    old = client.get(
+        '/todos/?q=old', headers={'Authorization': f'Bearer {token}'}
+    )
+    new = client.get(
+        '/todos/?q=new', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert old.json()['todos'] == []
+    assert [todo['id'] for todo in new.json()['todos']] == [todo.id]
+
+
+def test_list_todos_search_rejects_cursor(client, token):
+    response = client.get(
+        '/todos/?q=milk&cursor=abc',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
 @pytest.mark.asyncio
 async def test_delete_todo(session, user, client, token):
     todo = TodoFactory(user_id=user.id)
@@ -147,6 +466,19 @@ async def test_delete_todo(session, user, client, token):
     assert response.json() == {'message': 'Task has been deleted successfully'}
 
 
+def test_delete_todo_runs_a_single_todo_update(client, token, count_queries):
+    auth = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/todos/', headers=auth, json={'title': 't', 'description': 'd'}
+    )
+
+    with count_queries() as queries:
+        client.delete('/todos/1', headers=auth)
+
+    updates = [query for query in queries if query.startswith('UPDATE todos')]
+    assert len(updates) == 1
+
+
 @pytest.mark.asyncio
 async def test_delete_todo_with_error(client, token):
     response = client.delete(
@@ -189,6 +521,28 @@ async def test_patch_todo(user, client, session, token):
     assert response.json()['title'] == 'test1'
 
 
+@pytest.mark.asyncio
+async def test_patch_todo_reads_updated_at_back_in_the_update(
+    user, client, session, token, count_queries
+):
+    expected_queries = 4
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    with count_queries() as queries:
+        response = client.patch(
+            f'/todos/{todo.id}',
+            headers={'Authorization': f'Bearer {token}'},
+            json={'title': 'test1'},
+        )
+
+    assert len(queries) == expected_queries
+    assert queries[-1].startswith('UPDATE todos')
+    assert 'RETURNING updated_at' in queries[-1]
+    assert response.json()['updated_at']
+
+
 def test_patch_todo_error(client, token):
     response = client.patch(
         '/todos/10',
@@ -200,6 +554,177 @@ def test_patch_todo_error(client, token):
     assert response.json() == {'detail': 'Task not found'}
 
 
+def test_create_todos_batch_returns_request_order(client, token):
+    todos = [
+        {'title': f'todo {number}', 'description': 'batch'}
+        for number in range(3)
+    ]
+
+    response = client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'todos': todos},
+    )
+
+    results = response.json()['results']
+    assert response.status_code == HTTPStatus.OK
+    assert [result['status'] for result in results] == ['created'] * 3
+    assert [result['todo']['title'] for result in results] == [
+        'todo 0',
+        'todo 1',
+        'todo 2',
+    ]
+    assert [result['id'] for result in results] == [1, 2, 3]
+
+
+def test_create_todos_batch_rejects_empty_batch(client, token):
+    response = client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'todos': []},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_batch_reports_each_item(
+    session, client, user, user_2, token
+):
+    mine = TodoFactory.create_batch(3, user_id=user.id, state=TodoState.todo)
+    other = TodoFactory(user_id=user_2.id, state=TodoState.todo)
+    session.add_all([*mine, other])
+    await session.commit()
+
+    response = client.patch(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'todos': [
+                {'id': mine[0].id, 'state': 'done'},
+                {'id': mine[1].id, 'state': 'done'},
+                {'id': mine[2].id, 'title': 'renamed'},
+                {'id': other.id, 'state': 'done'},
+            ]
+        },
+    )
+
+    results = response.json()['results']
+    assert [result['status'] for result in results] == [
+        'updated',
+        'updated',
+        'updated',
+        'not_found',
+    ]
+    assert results[0]['todo']['state'] == 'done'
+    assert results[2]['todo']['title'] == 'renamed'
+    assert results[2]['todo']['state'] == 'todo'
+    assert results[3]['todo'] is None
+
+    await session.refresh(other)
+    assert other.state == TodoState.todo
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('field', ['title', 'description', 'state'])
+async def test_patch_todos_batch_rejects_nulls(
+    session, client, user, token, field
+):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    response = client.patch(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'todos': [{'id': todo.id, field: None}]},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert f'{field} cannot be null' in response.json()['detail'][0]['msg']
+
+
+@pytest.mark.parametrize(
+    'write',
+    [
+        ('PATCH', '/todos/batch', {'todos': [{'id': 1, 'state': 'done'}]}),
+        ('DELETE', '/todos/batch', {'ids': [1]}),
+        ('PATCH', '/todos/1', {'state': 'done'}),
+        ('DELETE', '/todos/1', None),
+    ],
+)
+def test_todo_writes_lock_todos_before_the_user(
+    client, auth, create_todo, count_queries, write
+):
+    # every path takes the locks in one order, or PostgreSQL can deadlock
+    method, path, body = write
+    create_todo()
+
+    with count_queries() as queries:
+        client.request(method, path, headers=auth, json=body)
+
+    tables = [
+        'todos' if query.startswith('SELECT todos.') else 'users'
+        for query in queries
+        if query.startswith(('SELECT todos.', 'UPDATE users'))
+    ]
+    assert tables[:2] == ['todos', 'users']
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_batch_updates_each_value_set_once(
+    session, client, user, token, count_queries
+):
+    expected_updates = 2
+    todos = TodoFactory.create_batch(4, user_id=user.id)
+    session.add_all(todos)
+    await session.commit()
+
+    with count_queries() as queries:
+        client.patch(
+            '/todos/batch',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'todos': [
+                    {'id': todos[0].id, 'state': 'done'},
+                    {'id': todos[1].id, 'state': 'done'},
+                    {'id': todos[2].id, 'state': 'done'},
+                    {'id': todos[3].id, 'state': 'doing'},
+                ]
+            },
+        )
+
+    updates = [query for query in queries if query.startswith('UPDATE todos')]
+    assert len(updates) == expected_updates
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_batch_only_deletes_own_todos(
+    session, client, user, user_2, token
+):
+    mine = TodoFactory.create_batch(2, user_id=user.id)
+    other = TodoFactory(user_id=user_2.id)
+    session.add_all([*mine, other])
+    await session.commit()
+
+    response = client.request(
+        'DELETE',
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'ids': [mine[0].id, other.id, mine[0].id, 999]},
+    )
+
+    assert response.json()['results'] == [
+        {'id': mine[0].id, 'status': 'deleted', 'todo': None},
+        {'id': other.id, 'status': 'not_found', 'todo': None},
+        {'id': 999, 'status': 'not_found', 'todo': None},
+    ]
+    trashed = await session.scalars(
+        select(Todo.id).where(Todo.state == TodoState.trash)
+    )
+    assert trashed.all() == [mine[0].id]
+
+
 @pytest.mark.asyncio
 async def test_list_todos_should_return_all_expected_fields(
     session, client, user, token, mock_db_time
@@ -241,3 +766,25 @@ async def test_create_todo_error(session, user: User):
 
     with pytest.raises(LookupError):
         await session.scalar(select(Todo))
+
+
+@pytest.mark.asyncio
+async def test_list_todos_fast_path_matches_model_serialisation(
+    session, client, user, token
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    todos = await session.scalars(select(Todo).order_by(Todo.id))
+    expected = TodoList(
+        todos=[
+            TodoPublic.model_validate(todo, from_attributes=True)
+            for todo in todos
+        ]
+    )
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.headers['content-type'] == 'application/json'
+    assert response.content == expected.model_dump_json().encode()
@@ -0,0 +1,330 @@
+import csv
+import io
+import json
+from http import HTTPStatus
+
+import pytest
+
+from to_do_list.transfer import EXPORT_FIELDS
+
+
+@pytest.fixture
+def todos(client, auth):
+    return [
+        client.post(
+            '/todos/',
+            headers=auth,
+            json={'title': f'todo {number}', 'description': 'a, "b"\nc'},
+        ).json()
+        for number in range(3)
+    ]
+
+
+def test_export_streams_ndjson(client, auth, todos):
+    response = client.get('/todos/export', headers=auth)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert 'todos.ndjson' in response.headers['content-disposition']
+    assert [json.loads(line) for line in response.text.splitlines()] == todos
+
+
+def test_export_streams_csv(client, auth, todos):
+    response = client.get('/todos/export?format=csv', headers=auth)
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+
+    assert response.headers['content-type'].startswith('text/csv')
+    assert tuple(rows[0]) == EXPORT_FIELDS
+    assert [row['description'] for row in rows] == ['a, "b"\nc'] * 3
+    assert [int(row['id']) for row in rows] == [todo['id'] for todo in todos]
+
+
+def test_export_only_includes_own_todos(client, auth, todos, user_2):
+    other_token = client.post(
+        '/auth/token/',
+        data={'username': user_2.email, 'password': user_2.clean_password},
+    ).json()['access_token']
+
+    response = client.get(
+        '/todos/export', headers={'Authorization': f'Bearer {other_token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert not response.text
+
+
+def test_export_spans_several_chunks(client, auth, monkeypatch):
+    expected_todos = 5
+    monkeypatch.setattr('to_do_list.transfer.EXPORT_CHUNK_SIZE', 2)
+    client.post(
+        '/todos/batch',
+        headers=auth,
+        json={
+            'todos': [
+                {'title': f'todo {number}', 'description': 'chunk'}
+                for number in range(expected_todos)
+            ]
+        },
+    )
+
+    response = client.get('/todos/export', headers=auth)
+
+    assert len(response.text.splitlines()) == expected_todos
+
+
+def test_export_rejects_unknown_format(client, auth):
+    response = client.get('/todos/export?format=xml', headers=auth)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_import_ndjson_reports_accepted_and_rejected_lines(client, auth):
+    expected_accepted = 2
+    body = (
+        '{"title": "one", "description": "first"}\n'
+        '\n'
+        '{"title": "two", "description": "second", "state": "done"}\n'
+        '{"title": "three"}\n'
+        'not json\n'
+    )
+
+    response = client.post(
+        '/todos/import', headers=auth, content=body.encode()
+    )
+
+    result = response.json()
+    assert response.status_code == HTTPStatus.OK
+    assert result['accepted'] == expected_accepted
+    assert result['rejected'] == expected_accepted
+    assert [error['line'] for error in result['errors']] == [4, 5]
+    assert result['errors'][0]['detail'] == 'description: Field required'
+    todos = client.get('/todos/', headers=auth).json()['todos']
+    assert [(todo['title'], todo['state']) for todo in todos] == [
+        ('one', 'todo'),
+        ('two', 'done'),
+    ]
+
+
+def test_import_csv_handles_quoted_newlines(client, auth):
+    expected_accepted = 2
+    body = (
+        'title,description,state\r\n'
+        'plain,row,todo\r\n'
+        '"multi","line one\nline ""two""",doing\r\n'
+        'bad,row,nope\r\n'
+    )
+
+    response = client.post(
+        '/todos/import?format=csv', headers=auth, content=body.encode()
+    )
+
+    result = response.json()
+    assert result['accepted'] == expected_accepted
+    assert [error['line'] for error in result['errors']] == [5]
+    todos = client.get('/todos/', headers=auth).json()['todos']
+    assert todos[1]['description'] == 'line one\nline "two"'
+
+
+def test_import_csv_keeps_stray_quotes_in_unquoted_fields(client, auth):
+    expected_accepted = 3
+    body = (
+        'title,description,state\n'
+        'say "hi,desc,todo\n'
+        'ok,fine,todo\n'
+        'ok2,fine,done\n'
+    )
+
+    response = client.post(
+        '/todos/import?format=csv', headers=auth, content=body.encode()
+    )
+
+    assert response.json() == {
+        'accepted': expected_accepted,
+        'rejected': 0,
+        'errors': [],
+    }
+    todos = client.get('/todos/', headers=auth).json()['todos']
+    assert todos[0]['title'] == 'say "hi'
+
+
+def test_import_csv_reports_an_unterminated_quote(client, auth):
+    body = (
+        'title,description,state\n'
+        'ok,fine,todo\n'
+        '"open,desc,todo\n'
+        'rest,of,file\n'
+    )
+
+    response = client.post(
+        '/todos/import?format=csv', headers=auth, content=body.encode()
+    )
+
+    assert response.json() == {
+        'accepted': 1,
+        'rejected': 1,
+        'errors': [{'line': 3, 'detail': 'Unterminated quote'}],
+    }
+
+
+def test_import_csv_record_can_span_parse_batches(client, auth, monkeypatch):
+    expected_accepted = 2
+    monkeypatch.setattr('to_do_list.transfer.IMPORT_CHUNK_SIZE', 2)
+    body = (
+        'title,description,state\n"a","one\ntwo\nthree\nfour",todo\nb,c,done\n'
+    )
+
+    response = client.post(
+        '/todos/import?format=csv', headers=auth, content=body.encode()
+    )
+
+    assert response.json()['accepted'] == expected_accepted
+    todos = client.get('/todos/', headers=auth).json()['todos']
+    assert todos[0]['description'] == 'one\ntwo\nthree\nfour'
+
+
+def test_import_csv_caps_the_size_of_a_record(client, auth, monkeypatch):
+    monkeypatch.setattr('to_do_list.transfer.IMPORT_MAX_RECORD_SIZE', 50)
+    body = f'title,description,state\n"a","{"x" * 30}\n{"y" * 30}\n'
+
+    response = client.post(
+        '/todos/import?format=csv', headers=auth, content=body.encode()
+    )
+
+    assert response.json() == {
+        'accepted': 0,
+        'rejected': 1,
+        'errors': [
+            {'line': 2, 'detail': 'Record is longer than 50 characters'}
+        ],
+    }
+
+
+def test_import_caps_the_size_of_a_line(client, auth, monkeypatch):
+    monkeypatch.setattr('to_do_list.transfer.IMPORT_MAX_RECORD_SIZE', 50)
+    body = (
+        f'{{"title": "long", "description": "{"x" * 300}"}}\n'
+        '{"title": "short", "description": "fits"}\n'
+    )
+
+    response = client.post(
+        '/todos/import',
+        headers=auth,
+        content=iter([body[:100].encode(), body[100:].encode()]),
+    )
+
+    assert response.json() == {
+        'accepted': 1,
+        'rejected': 1,
+        'errors': [
+            {'line': 1, 'detail': 'Record is longer than 50 characters'}
+        ],
+    }
+
+
+def test_import_csv_caps_the_size_of_a_line(client, auth, monkeypatch):
+    monkeypatch.setattr('to_do_list.transfer.IMPORT_MAX_RECORD_SIZE', 50)
+    body = f'title,description,state\na,{"x" * 300},todo\nb,fits,todo'
+
+    response = client.post(
+        '/todos/import?format=csv', headers=auth, content=body.encode()
+    )
+
+    assert response.json() == {
+        'accepted': 1,
+        'rejected': 1,
+        'errors': [
+            {'line': 2, 'detail': 'Record is longer than 50 characters'}
+        ],
+    }
+
+
+def test_import_round_trips_an_export(client, auth, todos):
+    exported = client.get('/todos/export?format=csv', headers=auth).content
+
+    response = client.post(
+        '/todos/import?format=csv', headers=auth, content=exported
+    )
+
+    assert response.json() == {
+        'accepted': len(todos),
+        'rejected': 0,
+        'errors': [],
+    }
+
+
+def test_import_inserts_in_chunks(client, auth, monkeypatch, count_queries):
+    expected_inserts = 3
+    monkeypatch.setattr('to_do_list.transfer.IMPORT_CHUNK_SIZE', 2)
+    body = ''.join(
+        f'{{"title": "todo {number}", "description": "chunk"}}\n'
+        for number in range(5)
+    )
+
+    with count_queries() as queries:
+        client.post('/todos/import', headers=auth, content=body.encode())
+
+    inserts = [
+        query for query in queries if query.startswith('INSERT INTO todos ')
+    ]
+    assert len(inserts) == expected_inserts
+
+
+def test_import_writes_only_after_reading_the_upload(
+    client, auth, count_queries
+):
+    expected_accepted = 3
+    writes_while_uploading = []
+
+    def upload(queries):
+        for number in range(expected_accepted):
+            yield f'{{"title": "t{number}", "description": "d"}}\n'.encode()
+            writes_while_uploading.extend(
+                query for query in queries if not query.startswith('SELECT')
+            )
+
+    with count_queries() as queries:
+        response = client.post(
+            '/todos/import', headers=auth, content=upload(queries)
+        )
+
+    assert response.json()['accepted'] == expected_accepted
+    assert writes_while_uploading == []
+
+
+def test_import_caps_reported_errors(client, auth, monkeypatch):
+    expected_rejected = 5
+    expected_errors = 2
+    monkeypatch.setattr(
+        'to_do_list.transfer.IMPORT_MAX_ERRORS', expected_errors
+    )
+
+    response = client.post(
+        '/todos/import', headers=auth, content=b'{}\n' * expected_rejected
+    )
+
+    assert response.json()['rejected'] == expected_rejected
+    assert len(response.json()['errors']) == expected_errors
+
+
+def test_import_rejects_invalid_utf8(client, auth):
+    response = client.post(
+        '/todos/import', headers=auth, content=b'{"title": "\xff"}\n'
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Upload is not valid UTF-8'}
+    assert client.get('/todos/', headers=auth).json()['todos'] == []
+
+
+def test_import_bumps_the_collection_version(client, auth):
+    etag = client.get('/todos/', headers=auth).headers['ETag']
+
+    client.post(
+        '/todos/import',
+        headers=auth,
+        content=b'{"title": "new", "description": "etag"}\n',
+    )
+
+    response = client.get('/todos/', headers={**auth, 'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
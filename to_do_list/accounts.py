@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from to_do_list.models import (
+    DeletionStatus,
+    Todo,
+    TodoTombstone,
+    User,
+    UserDeletion,
+)
+from to_do_list.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# the per-user tables that can grow without bound; the rest go with the
+# user row through ON DELETE CASCADE
+CHUNKED_MODELS = (Todo, TodoTombstone)
+UNFINISHED = (
+    DeletionStatus.pending,
+    DeletionStatus.running,
+    DeletionStatus.failed,
+)
+
+
+async def _delete_chunk(
+    session: AsyncSession, model, user_id: int, chunk_size: int
+) -> int:
+    chunk = select(model.id).where(model.user_id == user_id).limit(chunk_size)
+    result = await session.execute(
+        delete(model).where(model.id.in_(chunk.scalar_subquery()))
+    )
+
+    return result.rowcount
+
+
+async def _delete_rows(
+    session: AsyncSession, deletion: UserDeletion, chunk_size: int
+):
+    for model in CHUNKED_MODELS:
+        deleted = chunk_size
+
+        while deleted == chunk_size:
+            deleted = await _delete_chunk(
+                session, model, deletion.user_id, chunk_size
+            )
+
+            if model is Todo:
+                deletion.todos_deleted += deleted
+
+            # a heartbeat, so the sweep leaves a live deletion alone
+            deletion.updated_at = func.now()
+            await session.commit()
+
+    await session.execute(delete(User).where(User.id == deletion.user_id))
+    deletion.status = DeletionStatus.done
+    await session.commit()
+
+
+async def delete_account(bind: AsyncEngine, deletion_id: str, chunk_size: int):
+    # Runs after the response is sent, so it reads through a session of its
+    # own and commits every chunk to keep transactions and locks short.
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        deletion = await session.get(UserDeletion, deletion_id)
+        deletion.status = DeletionStatus.running
+        user_id = deletion.user_id
+        await session.commit()
+
+        try:
+            await _delete_rows(session, deletion, chunk_size)
+        except Exception:
+            await session.rollback()
+            deletion.status = DeletionStatus.failed
+            await session.commit()
+            logger.exception('Deleting user %s failed', user_id)
+
+
+async def resume_deletions(
+    bind: AsyncEngine, chunk_size: int, stale_after: timedelta
+) -> int:
+    # Deletions run in the process that accepted them, so a restart or a
+    # crash leaves them unfinished. The conditional UPDATE claims each one
+    # for a single worker, even with several sweeping at once.
+    cutoff = datetime.now(tz=ZoneInfo('UTC')).replace(tzinfo=None) - (
+        stale_after
+    )
+
+    async with AsyncSession(bind) as session:
+        deletion_ids = await session.scalars(
+            update(UserDeletion)
+            .where(
+                UserDeletion.status.in_(UNFINISHED),
+                UserDeletion.updated_at < cutoff,
+            )
+            .values(status=DeletionStatus.running, updated_at=func.now())
+            .returning(UserDeletion.id)
+        )
+        deletion_ids = deletion_ids.all()
+        await session.commit()
+
+    for deletion_id in deletion_ids:
+        logger.info('Resuming deletion %s', deletion_id)
+        await delete_account(bind, deletion_id, chunk_size)
+
+    return len(deletion_ids)
+
+
+async def run_deletion_worker(bind: AsyncEngine, settings: Settings):
+    stale_after = timedelta(seconds=settings.ACCOUNT_DELETION_STALE_SECONDS)
+
+    while True:
+        try:
+            await resume_deletions(
+                bind, settings.ACCOUNT_DELETION_CHUNK_SIZE, stale_after
+            )
+        except Exception:
+            logger.exception('Resuming account deletions failed')
+
+        await asyncio.sleep(settings.ACCOUNT_DELETION_SWEEP_INTERVAL_SECONDS)
@@ -1,9 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 
-from to_do_list.routers import auth, todos, users
+from to_do_list.accounts import run_deletion_worker
+from to_do_list.database import engine
+from to_do_list.metrics import MetricsMiddleware
+from to_do_list.purge import run_purge_worker
+from to_do_list.routers import auth, internal, jwks, todos, users
+from to_do_list.security import password_hash_pool
+from to_do_list.settings import Settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = Settings()
+    workers = []
+
+    if settings.TRASH_PURGE_ENABLED:
+        workers.append(asyncio.create_task(run_purge_worker(engine, settings)))
+
+    if settings.ACCOUNT_DELETION_SWEEP_ENABLED:
+        workers.append(
+            asyncio.create_task(run_deletion_worker(engine, settings))
+        )
+
+    yield
+
+    for worker in workers:
+        worker.cancel()
+
+        with suppress(asyncio.CancelledError):
+            await worker
+
+    password_hash_pool.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, server_timing=Settings().SERVER_TIMING)
 
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(todos.router)
+app.include_router(internal.router)
+app.include_router(jwks.router)
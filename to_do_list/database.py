@@ -1,8 +1,93 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
+from to_do_list.metrics import instrument_engine
 from to_do_list.settings import Settings
 
-engine = create_async_engine(Settings().DATABASE_URL)
+settings = Settings()
+
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiters = 0
+
+    def _do_get(self):
+        self.waiters += 1
+        try:
+            return super()._do_get()
+        finally:
+            self.waiters -= 1
+
+
+def engine_options(settings: Settings) -> dict:
+    url = make_url(settings.DATABASE_URL)
+    options = {
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+        'query_cache_size': settings.DATABASE_QUERY_CACHE_SIZE,
+    }
+
+    if url.get_backend_name() == 'sqlite' and url.database in {
+        None,
+        '',
+        ':memory:',
+    }:
+        return options
+
+    options.update(
+        poolclass=MonitoredQueuePool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+    )
+
+    if url.get_driver_name() == 'psycopg':
+        options['connect_args'] = {
+            'prepare_threshold': settings.DATABASE_PREPARE_THRESHOLD
+        }
+
+    return options
+
+
+engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings))
+instrument_engine(engine.sync_engine)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # SQLite only enforces foreign keys, and so ON DELETE CASCADE, when
+    # asked to on every new connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.execute(f'PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}')
+    cursor.execute(f'PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}')
+    cursor.execute(f'PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS:d}')
+    cursor.close()
+
+
+if engine.dialect.name == 'sqlite':
+    event.listen(engine.sync_engine, 'connect', set_sqlite_pragmas)
+
+
+def pool_status(engine: AsyncEngine = engine) -> dict:
+    pool = engine.pool
+
+    if not isinstance(pool, QueuePool):
+        return {'pool': type(pool).__name__}
+
+    return {
+        'pool': type(pool).__name__,
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'waiters': getattr(pool, 'waiters', 0),
+    }
 
 
 async def get_session():  # pragma: no cover
@@ -0,0 +1,56 @@
+from hashlib import blake2b
+from http import HTTPStatus
+
+from fastapi import Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from to_do_list.models import User
+
+
+def make_etag(*parts) -> str:
+    digest = blake2b(':'.join(map(str, parts)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == '*':
+        return True
+
+    # If-None-Match uses the weak comparison, so W/ prefixes still match
+    tags = (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+    return etag in tags
+
+
+def cache_headers(etag: str) -> dict:
+    return {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED, headers=cache_headers(etag)
+    )
+
+
+async def get_todos_version(session: AsyncSession, user_id: int) -> int:
+    # Always read from the database: the principal cache can hold a user
+    # row that is older than the last todo write.
+    return await session.scalar(
+        select(User.todos_version).where(User.id == user_id)
+    )
+
+
+async def bump_todos_version(session: AsyncSession, user_id: int) -> int:
+    return await session.scalar(
+        update(User)
+        .where(User.id == user_id)
+        # todo writes are not profile edits, keep updated_at as it is
+        .values(
+            todos_version=User.todos_version + 1,
+            updated_at=User.updated_at,
+        )
+        .returning(User.todos_version)
+    )
@@ -0,0 +1,157 @@
+import json
+from base64 import urlsafe_b64decode
+from binascii import Error as BinasciiError
+from functools import lru_cache
+from pathlib import Path
+
+from jwt import DecodeError, decode, encode
+from jwt.algorithms import get_default_algorithms
+
+from to_do_list.settings import Settings
+
+try:
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+    from cryptography.hazmat.primitives.serialization import (
+        load_pem_private_key,
+    )
+except ImportError:  # pragma: no cover
+    load_pem_private_key = None
+
+
+def _algorithm_for(private_key) -> str:
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return 'EdDSA'
+
+    if isinstance(private_key, ec.EllipticCurvePrivateKey) and isinstance(
+        private_key.curve, ec.SECP256R1
+    ):
+        return 'ES256'
+
+    raise ValueError('Signing keys must be P-256 or Ed25519')
+
+
+@lru_cache(maxsize=64)
+def _header_kid(segment: str) -> str | None:
+    # every token signed with a key shares its header, so this decodes
+    # each header once per key rather than once per request
+    try:
+        header = json.loads(
+            urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+        )
+    except (BinasciiError, ValueError):
+        raise DecodeError('Invalid header')
+
+    if not isinstance(header, dict):
+        raise DecodeError('Invalid header')
+
+    kid = header.get('kid')
+
+    # an unhashable kid would fail the key lookup with a TypeError
+    if kid is not None and not isinstance(kid, str):
+        raise DecodeError('Invalid header')
+
+    return kid
+
+
+class KeyRing:
+    def __init__(
+        self,
+        secret: str,
+        algorithm: str,
+        private_keys: dict | None = None,
+        active_kid: str | None = None,
+        accept_secret_tokens: bool = True,
+    ):
+        self.secret = secret
+        self.algorithm = algorithm
+        self.private_keys = private_keys or {}
+        self.active_kid = active_kid
+        self.accept_secret_tokens = accept_secret_tokens or not active_kid
+        self.public_keys = {
+            kid: (key.public_key(), _algorithm_for(key))
+            for kid, key in self.private_keys.items()
+        }
+
+        # a kid without keys, e.g. an empty JWT_KEYS_DIR, would only fail
+        # once the first token is signed
+        if active_kid not in self.private_keys and (
+            active_kid or self.private_keys
+        ):
+            raise ValueError(f'No signing key with kid {active_kid!r}')
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> 'KeyRing':
+        if not settings.JWT_KEYS_DIR:
+            return cls(settings.SECRET_KEY, settings.ALGORITHM)
+
+        if load_pem_private_key is None:  # pragma: no cover
+            raise RuntimeError(
+                'JWT_KEYS_DIR needs the cryptography package '
+                '(pip install "pyjwt[crypto]")'
+            )
+
+        keys_dir = Path(settings.JWT_KEYS_DIR)
+
+        if not keys_dir.is_dir():
+            raise ValueError(f'{str(keys_dir)!r} is not a directory')
+
+        private_keys = {
+            path.stem: load_pem_private_key(path.read_bytes(), password=None)
+            for path in sorted(keys_dir.glob('*.pem'))
+        }
+
+        if not private_keys:
+            raise ValueError(f'No *.pem signing keys in {str(keys_dir)!r}')
+
+        return cls(
+            settings.SECRET_KEY,
+            settings.ALGORITHM,
+            private_keys,
+            settings.JWT_ACTIVE_KID,
+            settings.JWT_ACCEPT_SECRET_TOKENS,
+        )
+
+    def sign(self, payload: dict) -> str:
+        if not self.active_kid:
+            return encode(payload, self.secret, algorithm=self.algorithm)
+
+        private_key = self.private_keys[self.active_kid]
+
+        return encode(
+            payload,
+            private_key,
+            algorithm=_algorithm_for(private_key),
+            headers={'kid': self.active_kid},
+        )
+
+    def verify(self, token: str) -> dict:
+        kid = _header_kid(token.split('.', 1)[0])
+
+        # tokens without a kid predate the key ring and use the secret
+        if kid is None:
+            if not self.accept_secret_tokens:
+                raise DecodeError('Missing key id')
+
+            return decode(token, self.secret, algorithms=[self.algorithm])
+
+        if kid not in self.public_keys:
+            raise DecodeError('Unknown key id')
+
+        public_key, algorithm = self.public_keys[kid]
+
+        return decode(token, public_key, algorithms=[algorithm])
+
+    def jwks(self) -> dict:
+        algorithms = get_default_algorithms()
+
+        return {
+            'keys': [
+                {
+                    **algorithms[algorithm].to_jwk(public_key, as_dict=True),
+                    'kid': kid,
+                    'alg': algorithm,
+                    'use': 'sig',
+                }
+                for kid, (public_key, algorithm) in self.public_keys.items()
+            ]
+        }
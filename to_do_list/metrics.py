@@ -0,0 +1,216 @@
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_time: float = 0.0
+    hash_time: float = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    'request_stats', default=None
+)
+
+
+def current_request_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+
+    pairs = ','.join(
+        f'{key}="{_escape(value)}"' for key, value in labels.items()
+    )
+    return f'{{{pairs}}}'
+
+
+def render_family(
+    name: str, kind: str, help_text: str, samples: list[tuple[dict, float]]
+) -> list[str]:
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    lines.extend(
+        f'{name}{_format_labels(labels)} {value}' for labels, value in samples
+    )
+    return lines
+
+
+class MetricsRegistry:
+    histograms = {
+        'http_request_duration_seconds': (
+            'Request latency by route template.',
+            LATENCY_BUCKETS,
+        ),
+        'http_request_db_duration_seconds': (
+            'Time spent executing SQL per request.',
+            LATENCY_BUCKETS,
+        ),
+        'http_request_db_queries': (
+            'SQL statements executed per request.',
+            QUERY_BUCKETS,
+        ),
+        'http_request_password_hash_duration_seconds': (
+            'Time spent waiting on Argon2 per request.',
+            LATENCY_BUCKETS,
+        ),
+    }
+
+    def __init__(self):
+        self._series = {
+            name: defaultdict(lambda buckets=buckets: Histogram(buckets))
+            for name, (_, buckets) in self.histograms.items()
+        }
+
+    def observe_request(
+        self, labels: tuple, elapsed: float, stats: RequestStats
+    ):
+        values = {
+            'http_request_duration_seconds': elapsed,
+            'http_request_db_duration_seconds': stats.db_time,
+            'http_request_db_queries': stats.queries,
+            'http_request_password_hash_duration_seconds': stats.hash_time,
+        }
+
+        for name, value in values.items():
+            self._series[name][labels].observe(value)
+
+    def render(self) -> list[str]:
+        lines = []
+
+        for name, (help_text, buckets) in self.histograms.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+
+            for series, histogram in self._series[name].items():
+                labels = dict(zip(('method', 'route', 'status'), series))
+                cumulative = 0
+
+                for bound, count in zip((*buckets, '+Inf'), histogram.counts):
+                    cumulative += count
+                    bucket_labels = _format_labels({**labels, 'le': bound})
+                    lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+
+                lines.append(
+                    f'{name}_sum{_format_labels(labels)} {histogram.sum}'
+                )
+                lines.append(
+                    f'{name}_count{_format_labels(labels)} {histogram.count}'
+                )
+
+        return lines
+
+
+registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, *args):
+    conn.info.setdefault('query_start', []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, *args):
+    elapsed = perf_counter() - conn.info['query_start'].pop()
+    stats = _request_stats.get()
+
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def instrument_engine(engine: Engine):
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+                if self.server_timing:
+                    total = (perf_counter() - start) * 1000
+                    MutableHeaders(scope=message).append(
+                        'Server-Timing',
+                        f'db;dur={stats.db_time * 1000:.3f};'
+                        f'desc="{stats.queries} queries", '
+                        f'hash;dur={stats.hash_time * 1000:.3f}, '
+                        f'app;dur={total:.3f}',
+                    )
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get('route')
+            registry.observe_request(
+                (
+                    scope['method'],
+                    getattr(route, 'path', 'unmatched'),
+                    status,
+                ),
+                perf_counter() - start,
+                stats,
+            )
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, false, func
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
@@ -15,9 +15,17 @@ class TodoState(str, Enum):
     trash = 'trash'
 
 
+class DeletionStatus(str, Enum):
+    pending = 'pending'
+    running = 'running'
+    done = 'done'
+    failed = 'failed'
+
+
 @table_registry.mapped_as_dataclass
 class User:
     __tablename__ = 'users'
+    __mapper_args__ = {'eager_defaults': True}
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     username: Mapped[str] = mapped_column(unique=True)
@@ -32,16 +40,41 @@ class User:
         server_default=func.now(),
         onupdate=func.now(),
     )
+    todos_version: Mapped[int] = mapped_column(
+        init=False,
+        server_default='0',
+    )
+    # carried by every access token; bumping it revokes the older ones
+    token_version: Mapped[int] = mapped_column(
+        init=False,
+        default=0,
+        server_default='0',
+    )
+    # set when the account is deleted, until its rows are all gone
+    disabled: Mapped[bool] = mapped_column(
+        init=False,
+        default=False,
+        server_default=false(),
+    )
     todos: Mapped[list['Todo']] = relationship(
         init=False,
+        repr=False,
         cascade='all, delete-orphan',
-        lazy='selectin',
+        lazy='raise',
+        passive_deletes=True,
     )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __mapper_args__ = {'eager_defaults': True}
+    __table_args__ = (
+        Index('ix_todos_user_id_state', 'user_id', 'state'),
+        Index('ix_todos_user_id_id', 'user_id', 'id'),
+        Index('ix_todos_user_id_version', 'user_id', 'version'),
+        Index('ix_todos_state_updated_at', 'state', 'updated_at'),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
@@ -56,5 +89,66 @@ class Todo:
         server_default=func.now(),
         onupdate=func.now(),
     )
+    # users.todos_version at the time of the last write, for delta sync
+    version: Mapped[int] = mapped_column(
+        init=False,
+        default=0,
+        server_default='0',
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
 
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+
+@table_registry.mapped_as_dataclass
+class TodoTombstone:
+    __tablename__ = 'todo_tombstones'
+    __table_args__ = (
+        Index('ix_todo_tombstones_user_id_version', 'user_id', 'version'),
+    )
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    todo_id: Mapped[int]
+    version: Mapped[int]
+    deleted_at: Mapped[datetime] = mapped_column(
+        init=False,
+        server_default=func.now(),
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoStateCount:
+    __tablename__ = 'todo_state_counts'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
+
+@table_registry.mapped_as_dataclass
+class UserDeletion:
+    __tablename__ = 'user_deletions'
+
+    # random, since the status is read without a token once the user is gone
+    id: Mapped[str] = mapped_column(primary_key=True)
+    user_id: Mapped[int]
+    status: Mapped[DeletionStatus] = mapped_column(
+        default=DeletionStatus.pending
+    )
+    todos_deleted: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        init=False,
+        server_default=func.now(),
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        init=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
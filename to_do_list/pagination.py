@@ -0,0 +1,70 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import Select
+from sqlalchemy.orm import InstrumentedAttribute
+
+from to_do_list.schemas import FilterPage
+
+
+def encode_token(payload: dict) -> str:
+    data = json.dumps(payload, separators=(',', ':'))
+    return urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_payload(token: str, detail: str) -> dict:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(urlsafe_b64decode(padded))
+    except (Base64Error, ValueError, TypeError):
+        payload = None
+
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
+
+    return payload
+
+
+def is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def decode_token(token: str, key: str, detail: str) -> int:
+    value = decode_payload(token, detail).get(key)
+
+    if not is_int(value):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
+
+    return value
+
+
+def encode_cursor(last_id: int) -> str:
+    return encode_token({'id': last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    return decode_token(cursor, 'id', 'Invalid cursor')
+
+
+def paginate(query: Select, key: InstrumentedAttribute, page: FilterPage):
+    # A cursor seeks straight past the last key seen instead of reading and
+    # discarding `offset` rows; the extra row tells whether a next page exists.
+    if page.cursor:
+        query = query.where(key > decode_cursor(page.cursor))
+    else:
+        query = query.offset(page.offset)
+
+    return query.order_by(key).limit(page.limit + 1)
+
+
+def split_page(rows: list, page: FilterPage, key: str = 'id'):
+    items = rows[: page.limit]
+    next_cursor = None
+
+    if items and len(rows) > page.limit:
+        next_cursor = encode_cursor(getattr(items[-1], key))
+
+    return items, next_cursor
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import perf_counter, time
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Select, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from to_do_list.etags import bump_todos_version
+from to_do_list.models import Todo, TodoState, TodoTombstone
+from to_do_list.settings import Settings
+from to_do_list.stats import apply_state_deltas, state_changes
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PurgeStats:
+    runs: int = 0
+    failures: int = 0
+    batches: int = 0
+    purged: int = 0
+    pruned_tombstones: int = 0
+    last_run: float = 0
+    last_duration: float = 0
+
+
+purge_stats = PurgeStats()
+
+
+async def bury_todos(session: AsyncSession, user_id: int, todo_ids):
+    version = await bump_todos_version(session, user_id)
+
+    if todo_ids:
+        await session.execute(
+            insert(TodoTombstone),
+            [
+                {'todo_id': todo_id, 'user_id': user_id, 'version': version}
+                for todo_id in todo_ids
+            ],
+        )
+
+
+def expired_trash_query(cutoff: datetime, batch_size: int) -> Select:
+    # a trashed todo expires once it has sat untouched for the retention
+    return (
+        select(Todo.id)
+        .where(Todo.state == TodoState.trash, Todo.updated_at < cutoff)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+
+async def purge_batch(
+    session: AsyncSession, cutoff: datetime, batch_size: int
+) -> int:
+    expired = expired_trash_query(cutoff, batch_size)
+    deleted = await session.execute(
+        delete(Todo)
+        .where(Todo.id.in_(expired.scalar_subquery()))
+        .returning(Todo.user_id, Todo.id)
+    )
+    deleted = deleted.all()
+    owners = Counter(user_id for user_id, _ in deleted)
+
+    for user_id, purged in owners.items():
+        await bury_todos(
+            session,
+            user_id,
+            [todo_id for owner, todo_id in deleted if owner == user_id],
+        )
+        await apply_state_deltas(
+            session, user_id, state_changes([TodoState.trash] * purged)
+        )
+
+    await session.commit()
+
+    return len(deleted)
+
+
+async def purge_trash(
+    bind: AsyncEngine, retention: timedelta, batch_size: int
+) -> int:
+    # CURRENT_TIMESTAMP is naive UTC, so the cutoff is too
+    cutoff = datetime.now(tz=ZoneInfo('UTC')).replace(tzinfo=None) - retention
+    start = perf_counter()
+    total = 0
+
+    # one short transaction per batch keeps the locks held small
+    async with AsyncSession(bind) as session:
+        while True:
+            purged = await purge_batch(session, cutoff, batch_size)
+            purge_stats.batches += 1
+            purge_stats.purged += purged
+            total += purged
+
+            if purged < batch_size:
+                break
+
+    purge_stats.runs += 1
+    purge_stats.last_run = time()
+    purge_stats.last_duration = perf_counter() - start
+
+    return total
+
+
+async def prune_tombstones(
+    bind: AsyncEngine, retention: timedelta, batch_size: int
+) -> int:
+    cutoff = datetime.now(tz=ZoneInfo('UTC')).replace(tzinfo=None) - retention
+    # ids grow with deleted_at, so walking the primary key finds the
+    # expired tombstones first and needs no index of its own
+    expired = (
+        select(TodoTombstone.id)
+        .where(TodoTombstone.deleted_at < cutoff)
+        .order_by(TodoTombstone.id)
+        .limit(batch_size)
+    )
+    total = 0
+
+    async with AsyncSession(bind) as session:
+        while True:
+            pruned = await session.execute(
+                delete(TodoTombstone).where(
+                    TodoTombstone.id.in_(expired.scalar_subquery())
+                )
+            )
+            await session.commit()
+            total += pruned.rowcount
+
+            if pruned.rowcount < batch_size:
+                break
+
+    purge_stats.pruned_tombstones += total
+
+    return total
+
+
+async def run_purge_worker(bind: AsyncEngine, settings: Settings):
+    retention = timedelta(days=settings.TRASH_RETENTION_DAYS)
+    sync_retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+    while True:
+        await asyncio.sleep(settings.TRASH_PURGE_INTERVAL_SECONDS)
+
+        try:
+            await purge_trash(bind, retention, settings.TRASH_PURGE_BATCH_SIZE)
+            await prune_tombstones(
+                bind, sync_retention, settings.TRASH_PURGE_BATCH_SIZE
+            )
+        except Exception:
+            purge_stats.failures += 1
+            logger.exception('Trash purge failed')
@@ -0,0 +1,153 @@
+from collections import Counter, OrderedDict
+from time import monotonic, time
+from typing import Any, Protocol
+
+from to_do_list.settings import Settings
+
+settings = Settings()
+
+
+class RateLimitBackend(Protocol):
+    # Returns 0 when a token was taken, otherwise the seconds until one is
+    # available. A shared store has to do this atomically, e.g. in a Lua
+    # script, or concurrent workers would hand out the same token.
+    async def take(
+        self, key: str, capacity: int, per_second: float
+    ) -> float: ...
+
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any, ttl: float) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class MemoryRateLimitBackend:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._values: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def _store(self, entries: OrderedDict, key: str, entry: tuple):
+        # bounded, since an attacker picks the usernames and addresses
+        entries[key] = entry
+        entries.move_to_end(key)
+
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    async def take(self, key: str, capacity: int, per_second: float) -> float:
+        now = monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * per_second)
+
+        if tokens >= 1:
+            self._store(self._buckets, key, (tokens - 1, now))
+            return 0.0
+
+        self._store(self._buckets, key, (tokens, now))
+        return (1 - tokens) / per_second
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._values.get(key)
+
+        if entry is None or entry[0] <= monotonic():
+            self._values.pop(key, None)
+            return None
+
+        return entry[1]
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._store(self._values, key, (monotonic() + ttl, value))
+
+    async def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+
+
+class LoginLimiter:
+    def __init__(self, backend: RateLimitBackend, settings: Settings):
+        self.backend = backend
+        self.settings = settings
+        self.rejected = Counter()
+        self.lockouts = 0
+
+    async def check(self, client_ip: str, username: str) -> float:
+        if not self.settings.LOGIN_RATE_LIMIT_ENABLED:
+            return 0.0
+
+        # wall-clock time, so a lockout means the same in every worker
+        lockout = await self.backend.get(f'login:failures:{username}')
+
+        if lockout and lockout['locked_until'] > time():
+            self.rejected.update(['lockout'])
+            return lockout['locked_until'] - time()
+
+        buckets = (
+            (
+                'ip',
+                f'login:ip:{client_ip}',
+                self.settings.LOGIN_IP_BURST,
+                self.settings.LOGIN_IP_PER_MINUTE,
+            ),
+            (
+                'username',
+                f'login:username:{username}',
+                self.settings.LOGIN_USERNAME_BURST,
+                self.settings.LOGIN_USERNAME_PER_MINUTE,
+            ),
+        )
+
+        for reason, key, capacity, per_minute in buckets:
+            retry_after = await self.backend.take(
+                key, capacity, per_minute / 60
+            )
+
+            if retry_after:
+                self.rejected.update([reason])
+                return retry_after
+
+        return 0.0
+
+    async def failed(self, username: str):
+        if not self.settings.LOGIN_RATE_LIMIT_ENABLED:
+            return
+
+        key = f'login:failures:{username}'
+        record = await self.backend.get(key) or {
+            'failures': 0,
+            'lockouts': 0,
+            'locked_until': 0,
+        }
+        record['failures'] += 1
+
+        # every lockout in a row lasts longer than the one before
+        if record['failures'] >= self.settings.LOGIN_LOCKOUT_FAILURES:
+            duration = min(
+                self.settings.LOGIN_LOCKOUT_SECONDS
+                * self.settings.LOGIN_LOCKOUT_BACKOFF ** record['lockouts'],
+                self.settings.LOGIN_LOCKOUT_MAX_SECONDS,
+            )
+            record = {
+                'failures': 0,
+                'lockouts': record['lockouts'] + 1,
+                'locked_until': time() + duration,
+            }
+            self.lockouts += 1
+
+        # a quiet spell as long as the longest lockout starts over
+        await self.backend.set(
+            key, record, self.settings.LOGIN_LOCKOUT_MAX_SECONDS
+        )
+
+    async def succeeded(self, username: str):
+        await self.backend.delete(f'login:failures:{username}')
+
+
+login_limiter = LoginLimiter(
+    MemoryRateLimitBackend(maxsize=settings.LOGIN_RATE_LIMIT_MAX_KEYS),
+    settings,
+)
+
+
+def get_login_limiter() -> LoginLimiter:
+    return login_limiter
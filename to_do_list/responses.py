@@ -0,0 +1,22 @@
+from pydantic import TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+
+class AdapterJSONResponse(Response):
+    # dumps plain data through a TypeAdapter, with no model validation
+    media_type = 'application/json'
+
+    def __init__(
+        self,
+        content,
+        adapter: TypeAdapter,
+        status_code: int = 200,
+        headers: dict | None = None,
+        background: BackgroundTask | None = None,
+    ):
+        self.adapter = adapter
+        super().__init__(content, status_code, headers, background=background)
+
+    def render(self, content) -> bytes:
+        return self.adapter.dump_json(content)
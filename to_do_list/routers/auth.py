@@ -1,18 +1,21 @@
 from http import HTTPStatus
+from math import ceil
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from to_do_list.database import get_session
 from to_do_list.models import User
+from to_do_list.ratelimit import LoginLimiter, get_login_limiter
 from to_do_list.schemas import Token
 from to_do_list.security import (
     create_access_token,
     get_current_user,
-    verify_password,
+    token_claims,
+    verify_password_async,
 )
 
 router = APIRouter(prefix='/auth', tags=['auth'])
@@ -20,33 +23,48 @@ router = APIRouter(prefix='/auth', tags=['auth'])
 FormData = Annotated[OAuth2PasswordRequestForm, Depends()]
 Session = Annotated[AsyncSession, Depends(get_session)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
+Limiter = Annotated[LoginLimiter, Depends(get_login_limiter)]
 
 
 @router.post('/token/', status_code=HTTPStatus.OK, response_model=Token)
-async def login_for_access_token(session: Session, form_data: FormData):
-    user = await session.scalar(
-        select(User).where(User.email == form_data.username)
-    )
+async def login_for_access_token(
+    request: Request, session: Session, form_data: FormData, limiter: Limiter
+):
+    username = form_data.username.lower()
+    client_ip = request.client.host if request.client else 'unknown'
 
-    if not user:
+    # Turned away before the user query and the Argon2 verify, which is
+    # what a credential-stuffing burst would otherwise spend the CPU on.
+    if retry_after := await limiter.check(client_ip, username):
         raise HTTPException(
-            detail='Incorrect username or password',
-            status_code=HTTPStatus.UNAUTHORIZED,
+            detail='Too many login attempts',
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            headers={'Retry-After': str(ceil(retry_after))},
         )
 
-    elif not verify_password(form_data.password, user.password):
+    user = await session.scalar(
+        select(User).where(User.email == form_data.username)
+    )
+
+    if (
+        not user
+        or user.disabled
+        or not await verify_password_async(form_data.password, user.password)
+    ):
+        await limiter.failed(username)
         raise HTTPException(
             detail='Incorrect username or password',
             status_code=HTTPStatus.UNAUTHORIZED,
         )
 
-    access_token = create_access_token(data={'sub': user.email})
+    await limiter.succeeded(username)
+    access_token = create_access_token(data=token_claims(user))
 
     return Token(access_token=access_token, token_type='bearer')
 
 
 @router.post('/refresh_token', response_model=Token)
 async def refresh_access_token(user: CurrentUser):
-    new_access_token = create_access_token(data={'sub': user.email})
+    new_access_token = create_access_token(data=token_claims(user))
 
     return {'access_token': new_access_token, 'token_type': 'bearer'}
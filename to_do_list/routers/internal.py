@@ -0,0 +1,122 @@
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from to_do_list.cache import CacheBackend
+from to_do_list.database import pool_status
+from to_do_list.metrics import registry, render_family
+from to_do_list.purge import purge_stats
+from to_do_list.ratelimit import LoginLimiter, get_login_limiter
+from to_do_list.security import get_principal_cache, password_hash_pool
+
+router = APIRouter(tags=['internal'], include_in_schema=False)
+
+PrincipalCache = Annotated[CacheBackend, Depends(get_principal_cache)]
+Limiter = Annotated[LoginLimiter, Depends(get_login_limiter)]
+
+
+class PrometheusResponse(PlainTextResponse):
+    media_type = 'text/plain; version=0.0.4'
+
+
+@router.get('/internal/pool', status_code=HTTPStatus.OK)
+async def database_pool():
+    return pool_status()
+
+
+@router.get('/metrics', response_class=PrometheusResponse)
+async def metrics(principal_cache: PrincipalCache, limiter: Limiter):
+    pool = pool_status()
+    lines = registry.render()
+
+    lines += render_family(
+        'db_pool_connections',
+        'gauge',
+        'Database pool connections by state.',
+        [
+            ({'state': state}, pool[state])
+            for state in ('checked_in', 'checked_out', 'overflow', 'waiters')
+            if state in pool
+        ],
+    )
+    lines += render_family(
+        'principal_cache_requests_total',
+        'counter',
+        'Principal cache lookups by result.',
+        [
+            ({'result': 'hit'}, principal_cache.hits),
+            ({'result': 'miss'}, principal_cache.misses),
+        ],
+    )
+    lines += render_family(
+        'password_hash_pending',
+        'gauge',
+        'Argon2 jobs submitted and not finished.',
+        [({}, password_hash_pool.pending)],
+    )
+    lines += render_family(
+        'password_hash_queue_depth',
+        'gauge',
+        'Argon2 jobs waiting for a free worker.',
+        [({}, password_hash_pool.queue_depth)],
+    )
+
+    lines += render_family(
+        'login_rate_limited_total',
+        'counter',
+        'Logins turned away before any work, by reason.',
+        [
+            ({'reason': reason}, limiter.rejected[reason])
+            for reason in ('ip', 'username', 'lockout')
+        ],
+    )
+    lines += render_family(
+        'login_lockouts_total',
+        'counter',
+        'Usernames locked out after repeated failed logins.',
+        [({}, limiter.lockouts)],
+    )
+
+    lines += render_family(
+        'trash_purge_runs_total',
+        'counter',
+        'Trash purge runs by outcome.',
+        [
+            ({'outcome': 'ok'}, purge_stats.runs),
+            ({'outcome': 'failed'}, purge_stats.failures),
+        ],
+    )
+    lines += render_family(
+        'trash_purge_batches_total',
+        'counter',
+        'Delete batches issued by the trash purge.',
+        [({}, purge_stats.batches)],
+    )
+    lines += render_family(
+        'trash_purged_todos_total',
+        'counter',
+        'Trashed todos deleted for good.',
+        [({}, purge_stats.purged)],
+    )
+    lines += render_family(
+        'sync_tombstones_pruned_total',
+        'counter',
+        'Sync tombstones deleted once past their retention.',
+        [({}, purge_stats.pruned_tombstones)],
+    )
+    lines += render_family(
+        'trash_purge_last_run_timestamp_seconds',
+        'gauge',
+        'When the last trash purge finished.',
+        [({}, purge_stats.last_run)],
+    )
+    lines += render_family(
+        'trash_purge_last_duration_seconds',
+        'gauge',
+        'How long the last trash purge took.',
+        [({}, purge_stats.last_duration)],
+    )
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,18 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Response
+
+from to_do_list.keys import KeyRing
+from to_do_list.security import get_key_ring
+
+router = APIRouter(tags=['auth'])
+
+Keys = Annotated[KeyRing, Depends(get_key_ring)]
+
+
+@router.get('/.well-known/jwks.json')
+async def jwks(key_ring: Keys, response: Response):
+    # keys only change on a deploy, so verifiers may hold on to them
+    response.headers['Cache-Control'] = 'public, max-age=300'
+
+    return key_ring.jwks()
@@ -1,27 +1,111 @@
+from collections import defaultdict
 from http import HTTPStatus
+from time import time
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from to_do_list.cache import CacheBackend
 from to_do_list.database import get_session
-from to_do_list.models import Todo, User
+from to_do_list.etags import (
+    bump_todos_version,
+    cache_headers,
+    etag_matches,
+    get_todos_version,
+    make_etag,
+    not_modified,
+)
+from to_do_list.models import Todo, TodoState, TodoTombstone, User
+from to_do_list.pagination import (
+    paginate,
+    split_page,
+)
+from to_do_list.responses import AdapterJSONResponse
 from to_do_list.schemas import (
+    FilterChanges,
+    FilterStats,
     FilterTodo,
     Message,
+    TodoBatchCreate,
+    TodoBatchDelete,
+    TodoBatchResult,
+    TodoBatchUpdate,
+    TodoChanges,
+    TodoImportResult,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
+    todo_change_set_adapter,
+    todo_page_adapter,
+)
+from to_do_list.search import search_todos
+from to_do_list.security import (
+    Principal,
+    get_current_principal,
+    get_current_user,
+)
+from to_do_list.settings import Settings
+from to_do_list.stats import (
+    apply_state_deltas,
+    bucketed_counts_query,
+    count_todos,
+    get_count_cache,
+    state_changes,
+    state_counts_query,
+)
+from to_do_list.sync import (
+    TODO,
+    TOMBSTONE,
+    SyncPosition,
+    after,
+    decode_sync_token,
+    encode_sync_token,
+    position_after,
+    split_changes,
+)
+from to_do_list.transfer import (
+    MEDIA_TYPES,
+    TransferFormat,
+    export_todos,
+    import_todos,
 )
-from to_do_list.security import get_current_user
 
 router = APIRouter(prefix='/todos', tags=['todos'])
+settings = Settings()
 
 Session = Annotated[AsyncSession, Depends(get_session)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
+# read-only endpoints, which AUTH_CLAIMS_ONLY serves from the token alone
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
 Filter = Annotated[FilterTodo, Query()]
+StatsFilter = Annotated[FilterStats, Query()]
+ChangesFilter = Annotated[FilterChanges, Query()]
+IfNoneMatch = Annotated[str | None, Header()]
+Format = Annotated[TransferFormat, Query(alias='format')]
+CountCache = Annotated[CacheBackend, Depends(get_count_cache)]
+
+# Read paths select TodoPublic's columns, in its field order, as plain rows
+TODO_ROW_COLUMNS = (
+    Todo.title,
+    Todo.description,
+    Todo.state,
+    Todo.id,
+    Todo.created_at,
+    Todo.updated_at,
+)
 
 
 @router.post('/', response_model=TodoPublic)
@@ -32,18 +116,34 @@ async def create_todo(todo: TodoSchema, user: CurrentUser, session: Session):
         state=todo.state,
         user_id=user.id,
     )
+    db_todo.version = await bump_todos_version(session, user.id)
+    await apply_state_deltas(
+        session, user.id, state_changes(new_states=[todo.state])
+    )
 
     session.add(db_todo)
-
     await session.commit()
-    await session.refresh(db_todo)
 
     return db_todo
 
 
 @router.get('/', response_model=TodoList)
-async def get_todos(user: CurrentUser, session: Session, todo_filter: Filter):
-    query = select(Todo).where(Todo.user_id == user.id)
+async def get_todos(
+    user: CurrentPrincipal,
+    session: Session,
+    todo_filter: Filter,
+    count_cache: CountCache,
+    if_none_match: IfNoneMatch = None,
+):
+    # Read the version before the todos: a write landing in between makes
+    # the body newer than its ETag, which only costs one extra full reply.
+    version = await get_todos_version(session, user.id)
+    etag = make_etag(user.id, version, todo_filter.model_dump_json())
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    query = select(*TODO_ROW_COLUMNS).where(Todo.user_id == user.id)
 
     if todo_filter.title:
         query = query.filter(Todo.title.contains(todo_filter.title))
@@ -53,20 +153,358 @@ async def get_todos(user: CurrentUser, session: Session, todo_filter: Filter):
             Todo.description.contains(todo_filter.description)
         )
 
+    # trashed todos are only listed when asked for by state
     if todo_filter.state:
         query = query.filter(Todo.state == todo_filter.state)
+    else:
+        query = query.filter(Todo.state != TodoState.trash)
+
+    if todo_filter.q:
+        query = search_todos(query, todo_filter.q, session.bind.dialect.name)
+        rows = await session.execute(
+            query.offset(todo_filter.offset).limit(todo_filter.limit + 1)
+        )
+        rows = rows.all()
+        todos, next_cursor = rows[: todo_filter.limit], None
+    else:
+        rows = await session.execute(paginate(query, Todo.id, todo_filter))
+        rows = rows.all()
+        todos, next_cursor = split_page(rows, todo_filter)
+
+    # both paths fetch one row past the page, so this costs no extra query
+    has_more = len(rows) > todo_filter.limit
+
+    total = None
+
+    if todo_filter.count:
+        total = await count_todos(
+            session, query, todo_filter, count_cache, (user.id, version)
+        )
+
+    # Rows go straight to JSON: no ORM objects and no TodoList validation.
+    return AdapterJSONResponse(
+        {
+            'todos': [todo._asdict() for todo in todos],
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+            'total': total,
+        },
+        adapter=todo_page_adapter,
+        headers=cache_headers(etag),
+    )
+
+
+@router.get('/changes', response_model=TodoChanges)
+async def get_todo_changes(
+    user: CurrentPrincipal, session: Session, changes_filter: ChangesFilter
+):
+    # Same ordering rule as the ETag: anything written after this read is
+    # sent again on the next sync, never skipped.
+    version = await get_todos_version(session, user.id)
+    started_at = int(time())
+    limit = changes_filter.limit
+    query = select(*TODO_ROW_COLUMNS, Todo.version).where(
+        Todo.user_id == user.id
+    )
+    deleted = []
+
+    if changes_filter.since is None:
+        # A new client has nothing to hide, so it gets no trash. Later syncs
+        # do send trashed rows, state and all, so the client can drop them.
+        position = None
+        query = query.where(Todo.state != TodoState.trash)
+    else:
+        position = decode_sync_token(
+            changes_filter.since,
+            settings.SYNC_TOMBSTONE_RETENTION_DAYS * 24 * 3600,
+        )
+        query = query.where(after(position, TODO, Todo.version, Todo.id))
+        deleted = await session.execute(
+            select(TodoTombstone.version, TodoTombstone.todo_id)
+            .where(
+                TodoTombstone.user_id == user.id,
+                after(
+                    position,
+                    TOMBSTONE,
+                    TodoTombstone.version,
+                    TodoTombstone.todo_id,
+                ),
+            )
+            .order_by(TodoTombstone.version, TodoTombstone.todo_id)
+            .limit(limit + 1)
+        )
+
+    todos = await session.execute(
+        query.order_by(Todo.version, Todo.id).limit(limit + 1)
+    )
+    page, has_more = split_changes(todos, deleted, limit)
+    next_position = (
+        position_after(page[-1], position, started_at)
+        if has_more
+        else SyncPosition(version, started_at)
+    )
+
+    # the adapter leaves the version column out of the body
+    todos = [row._asdict() for _, kind, _, row in page if kind == TODO]
+    alive = {todo['id'] for todo in todos}
+
+    return AdapterJSONResponse(
+        {
+            'todos': todos,
+            # SQLite may hand a deleted id out again; a live row wins
+            'deleted': sorted(
+                {todo_id for _, kind, todo_id, _ in page if kind == TOMBSTONE}
+                - alive
+            ),
+            'sync_token': encode_sync_token(next_position),
+            'has_more': has_more,
+        },
+        adapter=todo_change_set_adapter,
+    )
+
+
+@router.get('/stats', response_model=TodoStats)
+async def get_todo_stats(
+    user: CurrentPrincipal, session: Session, stats_filter: StatsFilter
+):
+    # the counter table holds at most one row per state
+    counts = await session.execute(state_counts_query(user.id))
+    counts = {state.value: count for state, count in counts}
+    # trash is counted on its own but, as in listings, not in the total
+    stats = {
+        'total': sum(
+            count
+            for state, count in counts.items()
+            if state != TodoState.trash.value
+        ),
+        'counts': counts,
+    }
+
+    if stats_filter.bucket:
+        rows = await session.execute(
+            bucketed_counts_query(
+                user.id, stats_filter, session.bind.dialect.name
+            )
+        )
+        buckets = defaultdict(dict)
+        for start, state, count in rows:
+            buckets[start][state.value] = count
+
+        stats['buckets'] = [
+            {'start': start, 'counts': bucket_counts}
+            for start, bucket_counts in buckets.items()
+        ]
+
+    return stats
+
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_todo_list(
+    user: CurrentPrincipal, session: Session, export_format: Format = 'ndjson'
+):
+    return StreamingResponse(
+        export_todos(session.bind, user.id, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="todos.{export_format}"'
+            )
+        },
+    )
+
+
+@router.post('/import', response_model=TodoImportResult)
+async def import_todo_list(
+    request: Request,
+    user: CurrentUser,
+    session: Session,
+    import_format: Format = 'ndjson',
+):
+    result = await import_todos(
+        session, user.id, request.stream(), import_format
+    )
 
+    await session.commit()
+
+    return result
+
+
+@router.post('/batch', response_model=TodoBatchResult)
+async def create_todos(
+    batch: TodoBatchCreate, user: CurrentUser, session: Session
+):
+    version = await bump_todos_version(session, user.id)
     todos = await session.scalars(
-        query.offset(todo_filter.offset).limit(todo_filter.limit)
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [
+            {**todo.model_dump(), 'user_id': user.id, 'version': version}
+            for todo in batch.todos
+        ],
+    )
+    todos = todos.all()
+    await apply_state_deltas(
+        session,
+        user.id,
+        state_changes(new_states=[todo.state for todo in todos]),
+    )
+
+    await session.commit()
+
+    return {
+        'results': [
+            {'id': todo.id, 'status': 'created', 'todo': todo}
+            for todo in todos
+        ]
+    }
+
+
+@router.patch('/batch', response_model=TodoBatchResult)
+async def patch_todos(
+    batch: TodoBatchUpdate, user: CurrentUser, session: Session
+):
+    changes = {
+        item.id: item.model_dump(exclude_unset=True, exclude={'id'})
+        for item in batch.todos
+    }
+
+    # one UPDATE ... WHERE id IN (...) per distinct set of new values
+    groups = defaultdict(list)
+    for todo_id, values in changes.items():
+        groups[tuple(sorted(values.items()))].append(todo_id)
+
+    # todo rows are locked before the users row on every write path, so
+    # concurrent writers queue instead of deadlocking
+    old_states = await session.execute(
+        select(Todo.id, Todo.state)
+        .where(Todo.user_id == user.id, Todo.id.in_(changes))
+        .order_by(Todo.id)
+        .with_for_update()
+    )
+    old_states = dict(old_states.all())
+
+    version = await bump_todos_version(session, user.id)
+    updated = {}
+    deltas = state_changes()
+    for values, todo_ids in groups.items():
+        owned = (Todo.user_id == user.id, Todo.id.in_(todo_ids))
+
+        if 'state' in dict(values):
+            found = [
+                old_states[todo_id]
+                for todo_id in todo_ids
+                if todo_id in old_states
+            ]
+            deltas.update(
+                state_changes(found, [dict(values)['state']] * len(found))
+            )
+
+        query = (
+            update(Todo)
+            .where(*owned)
+            .values({**dict(values), 'version': version})
+            .returning(Todo)
+            if values
+            else select(Todo).where(*owned)
+        )
+        todos = await session.scalars(
+            query,
+            execution_options={
+                'synchronize_session': False,
+                'populate_existing': True,
+            },
+        )
+        updated.update({todo.id: todo for todo in todos})
+
+    await apply_state_deltas(session, user.id, deltas)
+    await session.commit()
+
+    return {
+        'results': [
+            {'id': todo_id, 'status': 'updated', 'todo': updated[todo_id]}
+            if todo_id in updated
+            else {'id': todo_id, 'status': 'not_found'}
+            for todo_id in changes
+        ]
+    }
+
+
+@router.delete('/batch', response_model=TodoBatchResult)
+async def delete_todos(
+    batch: TodoBatchDelete, user: CurrentUser, session: Session
+):
+    todo_ids = list(dict.fromkeys(batch.ids))
+    deleted = await session.execute(
+        select(Todo.id, Todo.state)
+        .where(Todo.user_id == user.id, Todo.id.in_(todo_ids))
+        .order_by(Todo.id)
+        .with_for_update()
     )
+    deleted = dict(deleted.all())
+
+    # deleting only moves todos to the trash; the purge worker removes them
+    if deleted:
+        version = await bump_todos_version(session, user.id)
+        await session.execute(
+            update(Todo)
+            .where(Todo.user_id == user.id, Todo.id.in_(deleted))
+            .values(state=TodoState.trash, version=version)
+        )
+        await apply_state_deltas(
+            session,
+            user.id,
+            state_changes(deleted.values(), [TodoState.trash] * len(deleted)),
+        )
+
+    await session.commit()
 
-    return {'todos': todos.all()}
+    return {
+        'results': [
+            {
+                'id': todo_id,
+                'status': 'deleted' if todo_id in deleted else 'not_found',
+            }
+            for todo_id in todo_ids
+        ]
+    }
+
+
+@router.get('/{todo_id}', response_model=TodoPublic)
+async def get_todo(
+    todo_id: int,
+    user: CurrentPrincipal,
+    session: Session,
+    response: Response,
+    if_none_match: IfNoneMatch = None,
+):
+    version = await get_todos_version(session, user.id)
+    etag = make_etag(user.id, version, 'todo', todo_id)
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    todo = await session.execute(
+        select(*TODO_ROW_COLUMNS).where(
+            Todo.user_id == user.id,
+            Todo.id == todo_id,
+            Todo.state != TodoState.trash,
+        )
+    )
+    todo = todo.first()
+
+    if not todo:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Task not found'
+        )
+
+    response.headers.update(cache_headers(etag))
+
+    return todo._asdict()
 
 
 @router.delete('/{todo_id}', response_model=Message)
 async def delete_todo(todo_id: int, session: Session, user: CurrentUser):
     query = select(Todo).where(Todo.id == todo_id, Todo.user_id == user.id)
-    todo = await session.scalar(query)
+    todo = await session.scalar(query.with_for_update())
 
     if not todo:
         raise HTTPException(
@@ -74,7 +512,14 @@ async def delete_todo(todo_id: int, session: Session, user: CurrentUser):
             detail='Task not found',
         )
 
-    await session.delete(todo)
+    # bump first so the trash state and version go out in one UPDATE
+    version = await bump_todos_version(session, user.id)
+    await apply_state_deltas(
+        session, user.id, state_changes([todo.state], [TodoState.trash])
+    )
+    todo.state = TodoState.trash
+    todo.version = version
+    await session.commit()
 
     return {'message': 'Task has been deleted successfully'}
 
@@ -84,18 +529,26 @@ async def patch_todo(
     todo_id: int, session: Session, user: CurrentUser, todo: TodoUpdate
 ):
     query = select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
-    db_todo = await session.scalar(query)
+    db_todo = await session.scalar(query.with_for_update())
 
     if not db_todo:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found'
         )
 
+    # bump first so the new fields and version go out in one UPDATE
+    version = await bump_todos_version(session, user.id)
+    await apply_state_deltas(
+        session,
+        user.id,
+        state_changes([db_todo.state], [todo.state or db_todo.state]),
+    )
+
     for key, value in todo.model_dump(exclude_unset=True).items():
         setattr(db_todo, key, value)
 
+    db_todo.version = version
     session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
 
     return db_todo
@@ -1,28 +1,51 @@
 from http import HTTPStatus
+from secrets import token_urlsafe
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from to_do_list.accounts import delete_account
+from to_do_list.cache import CacheBackend
 from to_do_list.database import get_session
-from to_do_list.models import User
+from to_do_list.models import User, UserDeletion
+from to_do_list.pagination import paginate, split_page
+from to_do_list.responses import AdapterJSONResponse
 from to_do_list.schemas import (
     FilterPage,
-    Message,
+    UserDeletionPublic,
     UserList,
     UserPublic,
     UserSchema,
+    user_page_adapter,
 )
-from to_do_list.security import get_current_user, get_password_hash
+from to_do_list.security import (
+    Principal,
+    get_current_principal,
+    get_current_user,
+    get_current_user_for_update,
+    get_password_hash_async,
+    get_principal_cache,
+)
+from to_do_list.settings import Settings
 
 router = APIRouter(prefix='/users', tags=['users'])
+settings = Settings()
 
 Session = Annotated[AsyncSession, Depends(get_session)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
+# for credential changes, which always check the database
+UpdatingUser = Annotated[User, Depends(get_current_user_for_update)]
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+PrincipalCache = Annotated[CacheBackend, Depends(get_principal_cache)]
 FilterUsers = Annotated[FilterPage, Query()]
 
+# Read paths select UserPublic's columns only: no password hash, no
+# identity-map bookkeeping.
+USER_ROW_COLUMNS = (User.id, User.username, User.email)
+
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
 async def create_user(user: UserSchema, session: Session):
@@ -47,12 +70,11 @@ async def create_user(user: UserSchema, session: Session):
     db_user = User(
         username=user.username,
         email=user.email,
-        password=get_password_hash(user.password),
+        password=await get_password_hash_async(user.password),
     )
 
     session.add(db_user)
     await session.commit()
-    await session.refresh(db_user)
 
     return db_user
 
@@ -60,19 +82,52 @@ async def create_user(user: UserSchema, session: Session):
 @router.get('/', status_code=HTTPStatus.OK, response_model=UserList)
 async def list_users(
     session: Session,
-    current_user: CurrentUser,
+    principal: CurrentPrincipal,
     filter_users: FilterUsers,
 ):
-    users = await session.scalars(
-        select(User).limit(filter_users.limit).offset(filter_users.offset)
+    users = await session.execute(
+        paginate(
+            select(*USER_ROW_COLUMNS).where(User.disabled.is_(False)),
+            User.id,
+            filter_users,
+        )
+    )
+    users, next_cursor = split_page(users.all(), filter_users)
+
+    return AdapterJSONResponse(
+        {
+            'users': [user._asdict() for user in users],
+            'next_cursor': next_cursor,
+        },
+        adapter=user_page_adapter,
     )
 
-    return {'users': users}
+
+@router.get(
+    '/deletions/{deletion_id}',
+    status_code=HTTPStatus.OK,
+    response_model=UserDeletionPublic,
+)
+async def get_user_deletion(deletion_id: str, session: Session):
+    deletion = await session.get(UserDeletion, deletion_id)
+
+    if not deletion:
+        raise HTTPException(
+            detail='Deletion not found',
+            status_code=HTTPStatus.NOT_FOUND,
+        )
+
+    return deletion
 
 
 @router.get('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
 async def get_user(user_id: int, session: Session):
-    user = await session.scalar(select(User).where(User.id == user_id))
+    user = await session.execute(
+        select(*USER_ROW_COLUMNS).where(
+            User.id == user_id, User.disabled.is_(False)
+        )
+    )
+    user = user.first()
 
     if not user:
         raise HTTPException(
@@ -80,7 +135,7 @@ async def get_user(user_id: int, session: Session):
             status_code=HTTPStatus.NOT_FOUND,
         )
 
-    return user
+    return user._asdict()
 
 
 @router.put('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
@@ -88,7 +143,8 @@ async def update_user(
     user_id: int,
     user: UserSchema,
     session: Session,
-    current_user: CurrentUser,
+    current_user: UpdatingUser,
+    cache: PrincipalCache,
 ):
     if current_user.id != user_id:
         raise HTTPException(
@@ -96,14 +152,24 @@ async def update_user(
             status_code=HTTPStatus.FORBIDDEN,
         )
 
+    password = await get_password_hash_async(user.password)
+
     try:
-        current_user.username = user.username
-        current_user.email = user.email
-        current_user.password = get_password_hash(user.password)
+        # The version is bumped in SQL, so concurrent changes never write
+        # the same one; tokens issued before the change stop working.
+        current_user = await session.scalar(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                username=user.username,
+                email=user.email,
+                password=password,
+                token_version=User.token_version + 1,
+            )
+            .returning(User),
+            execution_options={'populate_existing': True},
+        )
         await session.commit()
-        await session.refresh(current_user)
-
-        return current_user
 
     except IntegrityError:
         raise HTTPException(
@@ -111,10 +177,22 @@ async def update_user(
             status_code=HTTPStatus.CONFLICT,
         )
 
+    await cache.delete(str(user_id))
+
+    return current_user
+
 
-@router.delete('/{user_id}', status_code=HTTPStatus.OK, response_model=Message)
+@router.delete(
+    '/{user_id}',
+    status_code=HTTPStatus.ACCEPTED,
+    response_model=UserDeletionPublic,
+)
 async def delete_user(
-    user_id: int, session: Session, current_user: CurrentUser
+    user_id: int,
+    session: Session,
+    current_user: UpdatingUser,
+    cache: PrincipalCache,
+    background_tasks: BackgroundTasks,
 ):
     if current_user.id != user_id:
         raise HTTPException(
@@ -122,7 +200,23 @@ async def delete_user(
             status_code=HTTPStatus.FORBIDDEN,
         )
 
-    await session.delete(current_user)
+    # Only flag the account here; its todos are deleted in chunks after the
+    # response, so the request costs the same whatever the account size.
+    await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(disabled=True, token_version=User.token_version + 1)
+    )
+    deletion = UserDeletion(id=token_urlsafe(16), user_id=user_id)
+    session.add(deletion)
     await session.commit()
+    await cache.delete(str(user_id))
+
+    background_tasks.add_task(
+        delete_account,
+        session.bind,
+        deletion.id,
+        settings.ACCOUNT_DELETION_CHUNK_SIZE,
+    )
 
-    return {'message': 'User deleted successfully'}
+    return deletion
@@ -1,8 +1,20 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import Literal
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    TypeAdapter,
+    model_validator,
+)
+from typing_extensions import TypedDict
 
-from to_do_list.models import TodoState
+from to_do_list.models import DeletionStatus, TodoState
+
+BATCH_MAX_SIZE = 500
+SYNC_MAX_LIMIT = 1000
 
 
 class Message(BaseModel):
@@ -24,6 +36,14 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
+
+
+class UserDeletionPublic(BaseModel):
+    id: str
+    status: DeletionStatus
+    todos_deleted: int
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Token(BaseModel):
@@ -34,12 +54,24 @@ class Token(BaseModel):
 class FilterPage(BaseModel):
     offset: int = Field(ge=0, default=0)
     limit: int = Field(ge=0, default=10)
+    cursor: str | None = None
 
 
 class FilterTodo(FilterPage):
     title: str | None = Field(default=None, min_length=3, max_length=20)
     description: str | None = None
     state: TodoState | None = None
+    q: str | None = Field(default=None, min_length=1, max_length=100)
+    # estimated totals may come from counters or a cached count, exact ones
+    # always run COUNT(*); without it the page carries no total at all
+    count: Literal['estimated', 'exact'] | None = None
+
+    @model_validator(mode='after')
+    def check_cursor_without_search(self):
+        if self.q and self.cursor:
+            raise ValueError('cursor cannot be combined with q')
+
+        return self
 
 
 class TodoSchema(BaseModel):
@@ -56,9 +88,138 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+    has_more: bool = False
+    total: int | None = None
+
+
+# Plain-dict twins of the public models, in the same field order, so read
+# paths can dump rows straight to JSON without building models first.
+class TodoRow(TypedDict):
+    title: str
+    description: str
+    state: TodoState
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class TodoPage(TypedDict):
+    todos: list[TodoRow]
+    next_cursor: str | None
+    has_more: bool
+    total: int | None
+
+
+class TodoChangeSet(TypedDict):
+    todos: list[TodoRow]
+    deleted: list[int]
+    sync_token: str
+    has_more: bool
+
+
+class UserRow(TypedDict):
+    id: int
+    username: str
+    email: str
+
+
+class UserPage(TypedDict):
+    users: list[UserRow]
+    next_cursor: str | None
+
+
+todo_page_adapter = TypeAdapter(TodoPage)
+todo_change_set_adapter = TypeAdapter(TodoChangeSet)
+user_page_adapter = TypeAdapter(UserPage)
+
+
+class FilterChanges(BaseModel):
+    since: str | None = None
+    limit: int = Field(ge=1, le=SYNC_MAX_LIMIT, default=SYNC_MAX_LIMIT)
+
+
+class TodoChanges(BaseModel):
+    todos: list[TodoPublic]
+    deleted: list[int]
+    # with has_more, sync again at once with this token for the next page
+    sync_token: str
+    has_more: bool = False
+
+
+class FilterStats(BaseModel):
+    bucket: Literal['day', 'week', 'month'] | None = None
+    field: Literal['created_at', 'updated_at'] = 'created_at'
+
+
+class TodoStateCounts(BaseModel):
+    draft: int = 0
+    todo: int = 0
+    doing: int = 0
+    done: int = 0
+    trash: int = 0
+
+
+class TodoStatsBucket(BaseModel):
+    start: date
+    counts: TodoStateCounts
+
+
+class TodoStats(BaseModel):
+    total: int
+    counts: TodoStateCounts
+    buckets: list[TodoStatsBucket] | None = None
 
 
 class TodoUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
+
+
+class TodoBatchCreate(BaseModel):
+    todos: list[TodoSchema] = Field(min_length=1, max_length=BATCH_MAX_SIZE)
+
+
+class TodoBatchUpdateItem(TodoUpdate):
+    id: int
+
+    @model_validator(mode='after')
+    def check_no_nulls(self):
+        # every todo column is NOT NULL, so a null can only be left out
+        for field in self.model_fields_set:
+            if getattr(self, field) is None:
+                raise ValueError(f'{field} cannot be null')
+
+        return self
+
+
+class TodoBatchUpdate(BaseModel):
+    todos: list[TodoBatchUpdateItem] = Field(
+        min_length=1, max_length=BATCH_MAX_SIZE
+    )
+
+
+class TodoBatchDelete(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=BATCH_MAX_SIZE)
+
+
+class TodoBatchItem(BaseModel):
+    id: int
+    status: Literal['created', 'updated', 'deleted', 'not_found']
+    todo: TodoPublic | None = None
+
+
+class TodoBatchResult(BaseModel):
+    results: list[TodoBatchItem]
+
+
+class TodoImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class TodoImportResult(BaseModel):
+    accepted: int
+    rejected: int
+    errors: list[TodoImportError]
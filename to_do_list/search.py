@@ -0,0 +1,100 @@
+import re
+
+from sqlalchemy import (
+    DDL,
+    Select,
+    column,
+    event,
+    false,
+    func,
+    literal_column,
+    table,
+)
+
+from to_do_list.models import Todo
+
+# Kept verbatim in the PostgreSQL index so the planner can match it.
+TODO_TSVECTOR = "to_tsvector('simple', title || ' ' || description)"
+
+SQLITE_DDL = (
+    'CREATE VIRTUAL TABLE todos_fts USING fts5('
+    "title, description, content='todos', content_rowid='id')",
+    'CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN '
+    'INSERT INTO todos_fts(rowid, title, description) '
+    'VALUES (new.id, new.title, new.description); END',
+    'CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN '
+    'INSERT INTO todos_fts(todos_fts, rowid, title, description) '
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    'CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description '
+    'ON todos BEGIN '
+    'INSERT INTO todos_fts(todos_fts, rowid, title, description) '
+    "VALUES ('delete', old.id, old.title, old.description); "
+    'INSERT INTO todos_fts(rowid, title, description) '
+    'VALUES (new.id, new.title, new.description); END',
+)
+POSTGRESQL_DDL = (
+    f'CREATE INDEX ix_todos_search ON todos USING gin ({TODO_TSVECTOR})',
+)
+
+for statement in SQLITE_DDL:
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+for statement in POSTGRESQL_DDL:
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='postgresql'),
+    )
+
+event.listen(
+    Todo.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS todos_fts').execute_if(dialect='sqlite'),
+)
+
+todos_fts = table('todos_fts', column('rowid'), column('rank'))
+
+
+def _fts5_query(terms: list[str]) -> str:
+    # Every word becomes a quoted prefix term, so user input can never be
+    # parsed as FTS5 query syntax.
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _tsquery(terms: list[str]) -> str:
+    # The same prefix terms as FTS5, bound as a parameter; \w+ words
+    # contain nothing to_tsquery would read as an operator.
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def search_todos(query: Select, q: str, dialect_name: str) -> Select:
+    terms = re.findall(r'\w+', q)
+
+    if not terms:
+        return query.where(false())
+
+    if dialect_name == 'sqlite':
+        return (
+            query
+            .join(todos_fts, todos_fts.c.rowid == Todo.id)
+            .where(literal_column('todos_fts').op('MATCH')(_fts5_query(terms)))
+            .order_by(todos_fts.c.rank, Todo.id)
+        )
+
+    if dialect_name == 'postgresql':
+        vector = literal_column(TODO_TSVECTOR)
+        tsquery = func.to_tsquery(literal_column("'simple'"), _tsquery(terms))
+        return query.where(vector.op('@@')(tsquery)).order_by(
+            func.ts_rank(vector, tsquery).desc(), Todo.id
+        )
+
+    for term in terms:
+        query = query.where(
+            Todo.title.contains(term) | Todo.description.contains(term)
+        )
+
+    return query.order_by(Todo.id)
@@ -1,21 +1,111 @@
+import asyncio
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from http import HTTPStatus
+from time import perf_counter
 from zoneinfo import ZoneInfo
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jwt import DecodeError, ExpiredSignatureError, decode, encode
+from jwt import DecodeError, ExpiredSignatureError
 from pwdlib import PasswordHash
-from sqlalchemy import select
+from sqlalchemy import inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
+from to_do_list.cache import CacheBackend, TTLCache
 from to_do_list.database import get_session
+from to_do_list.keys import KeyRing
+from to_do_list.metrics import current_request_stats
 from to_do_list.models import User
 from to_do_list.settings import Settings
 
 pwd_context = PasswordHash.recommended()
 settings = Settings()
 oauth_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
+key_ring = KeyRing.from_settings(settings)
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def get_principal_cache() -> CacheBackend:
+    return principal_cache
+
+
+def get_key_ring() -> KeyRing:
+    return key_ring
+
+
+def _user_snapshot(user: User) -> dict:
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(User).column_attrs
+    }
+
+
+def _user_from_snapshot(snapshot: dict) -> User:
+    user = inspect(User).class_manager.new_instance()
+
+    for key, value in snapshot.items():
+        setattr(user, key, value)
+
+    make_transient_to_detached(user)
+
+    return user
+
+
+class PasswordHashPool:
+    def __init__(self, executor: str, max_workers: int):
+        self.executor = executor
+        self.max_workers = max_workers
+        self.pending = 0
+        self._pool: Executor | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.pending - self.max_workers, 0)
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            executor_class = (
+                ProcessPoolExecutor
+                if self.executor == 'process'
+                else ThreadPoolExecutor
+            )
+            self._pool = executor_class(max_workers=self.max_workers)
+
+        return self._pool
+
+    async def run(self, func, *args):
+        self.pending += 1
+        start = perf_counter()
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), func, *args)
+        finally:
+            self.pending -= 1
+
+            if stats := current_request_stats():
+                stats.hash_time += perf_counter() - start
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+password_hash_pool = PasswordHashPool(
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+)
 
 
 def get_password_hash(password: str):
@@ -26,6 +116,16 @@ def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def get_password_hash_async(password: str):
+    return await password_hash_pool.run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await password_hash_pool.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
 
@@ -35,43 +135,109 @@ def create_access_token(data: dict):
 
     to_encode.update({'exp': expire})
 
-    encode_jwt = encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
+    return key_ring.sign(to_encode)
 
-    return encode_jwt
 
+def token_claims(user: User) -> dict:
+    return {'sub': user.email, 'uid': user.id, 'ver': user.token_version}
 
-async def get_current_user(
-    session: AsyncSession = Depends(get_session),
-    token: str = Depends(oauth_scheme),
-):
-    credentials_exception = HTTPException(
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
-    try:
-        payload = decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        subject_email = payload.get('sub')
 
-        if not subject_email:
-            raise credentials_exception
+def _verify_claims(token: str) -> dict:
+    try:
+        payload = key_ring.verify(token)
 
     except DecodeError:
-        raise credentials_exception
+        raise _credentials_exception()
 
     except ExpiredSignatureError:
-        raise credentials_exception
+        raise _credentials_exception()
 
-    user = await session.scalar(
-        select(User).where(User.email == subject_email)
-    )
+    # tokens issued before uid and ver were added have to be renewed
+    if not payload.get('sub') or not all(
+        isinstance(payload.get(claim), int) for claim in ('uid', 'ver')
+    ):
+        raise _credentials_exception()
+
+    return payload
 
-    if not user:
-        raise credentials_exception
+
+async def _load_user(
+    session: AsyncSession, claims: dict, for_update: bool = False
+) -> User:
+    query = select(User).where(User.id == claims['uid'])
+
+    if for_update:
+        # the locked read wins over whatever the session already holds
+        query = query.with_for_update().execution_options(
+            populate_existing=True
+        )
+
+    user = await session.scalar(query)
+
+    # disabled users are never cached, so only a lookup needs the check
+    if not user or user.disabled or user.token_version != claims['ver']:
+        raise _credentials_exception()
 
     return user
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth_scheme),
+    cache: CacheBackend = Depends(get_principal_cache),
+):
+    claims = _verify_claims(token)
+    cache_key = str(claims['uid'])
+    snapshot = await cache.get(cache_key)
+
+    # token versions only go up, so an older snapshot may simply be stale
+    # while a newer one means the token was revoked
+    if snapshot and snapshot['token_version'] > claims['ver']:
+        raise _credentials_exception()
+
+    if snapshot and snapshot['token_version'] == claims['ver']:
+        # load=False attaches the cached row to the session without a query
+        return await session.merge(_user_from_snapshot(snapshot), load=False)
+
+    user = await _load_user(session, claims)
+    await cache.set(cache_key, _user_snapshot(user))
+
+    return user
+
+
+async def get_current_user_for_update(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth_scheme),
+) -> User:
+    # Credential changes never trust a cache, which on another worker may
+    # still hold a revoked token version, and lock the row so that of two
+    # concurrent changes the later one sees the first one's revocation.
+    return await _load_user(session, _verify_claims(token), for_update=True)
+
+
+async def get_current_principal(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth_scheme),
+    cache: CacheBackend = Depends(get_principal_cache),
+) -> Principal:
+    if settings.AUTH_CLAIMS_ONLY:
+        claims = _verify_claims(token)
+        return Principal(id=claims['uid'], email=claims['sub'])
+
+    user = await get_current_user(session, token, cache)
+
+    return Principal(id=user.id, email=user.email)
@@ -1,3 +1,7 @@
+import os
+from typing import Literal
+
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,3 +14,75 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # A directory of <kid>.pem P-256 or Ed25519 private keys, which needs
+    # the cryptography package. The active key signs and every key in the
+    # directory verifies, so a rotated-out key stays until its tokens
+    # expire. Without it tokens are signed with SECRET_KEY and ALGORITHM.
+    JWT_KEYS_DIR: str | None = None
+    JWT_ACTIVE_KID: str | None = None
+    # Whether the key ring still accepts tokens without a kid, signed with
+    # SECRET_KEY. Turn it off once the last of those has expired, or
+    # anyone holding the old secret can keep minting tokens.
+    JWT_ACCEPT_SECRET_TOKENS: bool = True
+
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_QUERY_CACHE_SIZE: int = 500
+    # psycopg prepares a statement server-side after this many executions;
+    # None disables it, as required behind pgbouncer in transaction mode
+    DATABASE_PREPARE_THRESHOLD: int | None = 5
+    SQLITE_JOURNAL_MODE: str = 'WAL'
+    SQLITE_SYNCHRONOUS: str = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    SERVER_TIMING: bool = False
+
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60
+    # Read-only endpoints trust the token's claims and skip the user lookup.
+    # A revoked or deleted account then keeps read access until its tokens
+    # expire. Writes still look the user up, through the principal cache,
+    # and credential changes always check the database.
+    AUTH_CLAIMS_ONLY: bool = False
+
+    COUNT_CACHE_MAX_SIZE: int = 10_000
+    COUNT_CACHE_TTL_SECONDS: float = 300
+
+    # trashed todos untouched for the retention are deleted for good
+    TRASH_PURGE_ENABLED: bool = True
+    TRASH_RETENTION_DAYS: float = 30
+    TRASH_PURGE_INTERVAL_SECONDS: float = 3600
+    TRASH_PURGE_BATCH_SIZE: int = 500
+    # The purge worker also prunes sync tombstones older than this. A sync
+    # token older than it gets 410 Gone and the client syncs from scratch.
+    SYNC_TOMBSTONE_RETENTION_DAYS: float = 90
+
+    ACCOUNT_DELETION_CHUNK_SIZE: int = 1000
+    # deletions left unfinished by a restart or crash are picked up again
+    # once untouched for ACCOUNT_DELETION_STALE_SECONDS
+    ACCOUNT_DELETION_SWEEP_ENABLED: bool = True
+    ACCOUNT_DELETION_SWEEP_INTERVAL_SECONDS: float = 300
+    ACCOUNT_DELETION_STALE_SECONDS: float = 600
+
+    # Logins draw from token buckets per client IP and per username before
+    # any query or password hash. Repeated failures lock the username out,
+    # each lockout in a row LOGIN_LOCKOUT_BACKOFF times longer than the last.
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_MAX_KEYS: int = 100_000
+    LOGIN_IP_BURST: int = 20
+    LOGIN_IP_PER_MINUTE: float = 10
+    LOGIN_USERNAME_BURST: int = 5
+    LOGIN_USERNAME_PER_MINUTE: float = 2
+    LOGIN_LOCKOUT_FAILURES: int = 10
+    LOGIN_LOCKOUT_SECONDS: float = 60
+    LOGIN_LOCKOUT_BACKOFF: float = 2
+    LOGIN_LOCKOUT_MAX_SECONDS: float = 3600
+
+    PASSWORD_HASH_EXECUTOR: Literal['thread', 'process'] = 'thread'
+    # leaves a core to the event loop so hashing cannot starve it
+    PASSWORD_HASH_WORKERS: int = Field(
+        default_factory=lambda: max((os.cpu_count() or 2) - 1, 1)
+    )
@@ -0,0 +1,132 @@
+from collections import Counter
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from to_do_list.cache import CacheBackend, TTLCache
+from to_do_list.etags import make_etag
+from to_do_list.models import Todo, TodoState, TodoStateCount
+from to_do_list.schemas import FilterStats, FilterTodo
+from to_do_list.settings import Settings
+
+UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+COUNT_FILTER_FIELDS = {'title', 'description', 'state', 'q'}
+
+settings = Settings()
+count_cache = TTLCache(
+    maxsize=settings.COUNT_CACHE_MAX_SIZE,
+    ttl=settings.COUNT_CACHE_TTL_SECONDS,
+)
+
+
+def get_count_cache() -> CacheBackend:
+    return count_cache
+
+
+async def apply_state_deltas(
+    session: AsyncSession, user_id: int, deltas: Counter
+):
+    rows = [
+        {'user_id': user_id, 'state': state, 'count': delta}
+        for state, delta in deltas.items()
+        if delta
+    ]
+
+    if not rows:
+        return
+
+    upsert = UPSERTS[session.bind.dialect.name](TodoStateCount)
+    await session.execute(
+        upsert.on_conflict_do_update(
+            index_elements=['user_id', 'state'],
+            set_={'count': TodoStateCount.count + upsert.excluded.count},
+        ),
+        rows,
+    )
+
+
+def state_changes(old_states=(), new_states=()) -> Counter:
+    # subtract, unlike unary minus, keeps the negative counts
+    deltas = Counter(new_states)
+    deltas.subtract(old_states)
+    return deltas
+
+
+def _bucket_start(column, bucket: str, dialect_name: str):
+    # every bucket is labelled with the date it starts on
+    if dialect_name == 'postgresql':
+        return func.to_char(func.date_trunc(bucket, column), 'YYYY-MM-DD')
+
+    if bucket == 'week':
+        return func.date(column, 'weekday 0', '-6 days')
+
+    if bucket == 'month':
+        return func.strftime('%Y-%m-01', column)
+
+    return func.date(column)
+
+
+def state_counts_query(user_id: int) -> Select:
+    return select(TodoStateCount.state, TodoStateCount.count).where(
+        TodoStateCount.user_id == user_id
+    )
+
+
+def bucketed_counts_query(
+    user_id: int, stats_filter: FilterStats, dialect_name: str
+) -> Select:
+    start = _bucket_start(
+        getattr(Todo, stats_filter.field), stats_filter.bucket, dialect_name
+    )
+
+    return (
+        select(start.label('start'), Todo.state, func.count().label('count'))
+        .where(Todo.user_id == user_id)
+        .group_by(start, Todo.state)
+        .order_by(start)
+    )
+
+
+async def count_todos(
+    session: AsyncSession,
+    query: Select,
+    todo_filter: FilterTodo,
+    cache: CacheBackend,
+    scope: tuple[int, int],
+) -> int:
+    # scope is (user id, todos_version): a cached count is only reused
+    # until the next write to the collection
+    user_id, version = scope
+    exact = select(func.count()).select_from(query.order_by(None).subquery())
+
+    if todo_filter.count == 'exact':
+        return await session.scalar(exact)
+
+    # the counters answer any filter that narrows on state alone
+    if not (todo_filter.title or todo_filter.description or todo_filter.q):
+        counters = select(
+            func.coalesce(func.sum(TodoStateCount.count), 0)
+        ).where(TodoStateCount.user_id == user_id)
+
+        if todo_filter.state:
+            counters = counters.where(
+                TodoStateCount.state == todo_filter.state
+            )
+        else:
+            counters = counters.where(TodoStateCount.state != TodoState.trash)
+
+        return await session.scalar(counters)
+
+    key = make_etag(
+        user_id,
+        version,
+        todo_filter.model_dump_json(include=COUNT_FILTER_FIELDS),
+    )
+    total = await cache.get(key)
+
+    if total is None:
+        total = await session.scalar(exact)
+        await cache.set(key, total)
+
+    return total
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from http import HTTPStatus
+from time import time
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+from to_do_list.pagination import decode_payload, encode_token, is_int
+
+# Changes form one stream ordered by (version, kind, id): the tombstones of
+# a version come before its todos, and a sync token marks a place in it.
+TOMBSTONE = 0
+TODO = 1
+
+
+@dataclass
+class SyncPosition:
+    version: int
+    # when the sync this position belongs to started, in Unix seconds
+    issued_at: int
+    kind: int = TODO
+    # None once every change of the version has been sent
+    id: int | None = None
+
+
+def encode_sync_token(position: SyncPosition) -> str:
+    payload = {'v': position.version, 't': position.issued_at}
+
+    if position.id is not None:
+        payload.update(k=position.kind, id=position.id)
+
+    return encode_token(payload)
+
+
+def decode_sync_token(token: str, max_age: float) -> SyncPosition:
+    detail = 'Invalid sync token'
+    payload = decode_payload(token, detail)
+    position = SyncPosition(
+        version=payload.get('v'),
+        # tokens from before issued_at are treated as expired
+        issued_at=payload.get('t', 0),
+        kind=payload.get('k', TODO),
+        id=payload.get('id'),
+    )
+
+    if not (
+        is_int(position.version)
+        and is_int(position.issued_at)
+        and is_int(position.kind)
+        and position.kind in {TOMBSTONE, TODO}
+        and (position.id is None or is_int(position.id))
+    ):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
+
+    # older tombstones may have been pruned, so deletes could go missing
+    if position.issued_at < time() - max_age:
+        raise HTTPException(
+            status_code=HTTPStatus.GONE,
+            detail='Sync token expired, sync again without since',
+        )
+
+    return position
+
+
+def after(position: SyncPosition, kind: int, version, key):
+    # the changes of one kind that come past the position in the stream
+    if position.id is None or kind < position.kind:
+        return version > position.version
+
+    if kind > position.kind:
+        return version >= position.version
+
+    return or_(
+        version > position.version,
+        and_(version == position.version, key > position.id),
+    )
+
+
+def split_changes(todos, deleted, limit: int) -> tuple[list, bool]:
+    # Each kind comes in stream order, limit + 1 at most, so the first
+    # `limit` changes of the two together make up the page.
+    changes = sorted(
+        [(row.version, TODO, row.id, row) for row in todos]
+        + [
+            (version, TOMBSTONE, todo_id, None) for version, todo_id in deleted
+        ],
+        key=lambda change: change[:3],
+    )
+
+    return changes[:limit], len(changes) > limit
+
+
+def position_after(
+    change: tuple, since: SyncPosition | None, started_at: int
+) -> SyncPosition:
+    version, kind, key, _ = change
+
+    # the pages of one sync keep the time it started at
+    return SyncPosition(
+        version, since.issued_at if since else started_at, kind, key
+    )
@@ -0,0 +1,325 @@
+import codecs
+import csv
+import io
+import json
+from http import HTTPStatus
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, Literal
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from to_do_list.etags import bump_todos_version
+from to_do_list.models import Todo, TodoState
+from to_do_list.schemas import TodoPublic, TodoSchema
+from to_do_list.stats import apply_state_deltas, state_changes
+
+TransferFormat = Literal['ndjson', 'csv']
+
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = (
+    'id',
+    'title',
+    'description',
+    'state',
+    'created_at',
+    'updated_at',
+)
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_ERRORS = 100
+IMPORT_MAX_RECORD_SIZE = 64 * 1024
+# validated rows past this many bytes wait on disk rather than in memory
+IMPORT_SPOOL_SIZE = 1024 * 1024
+IMPORT_COLUMNS = ('title', 'description', 'state', 'user_id', 'version')
+COPY_TODOS = f'COPY todos ({", ".join(IMPORT_COLUMNS)}) FROM STDIN'
+
+
+def _ndjson(todos: list[TodoPublic]) -> str:
+    return ''.join(todo.model_dump_json() + '\n' for todo in todos)
+
+
+def _csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _csv_rows(todos: list[TodoPublic]):
+    for todo in todos:
+        data = todo.model_dump(mode='json')
+        yield [data[field] for field in EXPORT_FIELDS]
+
+
+async def export_todos(
+    bind: AsyncEngine, user_id: int, export_format: TransferFormat
+):
+    # The body is sent after the request's session has gone away, so the
+    # export reads through a session of its own.
+    async with AsyncSession(bind) as session:
+        rows = await session.stream(
+            select(*(getattr(Todo, field) for field in EXPORT_FIELDS))
+            # trashed todos are deleted as far as the user is concerned
+            .where(Todo.user_id == user_id, Todo.state != TodoState.trash)
+            .order_by(Todo.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+
+        if export_format == 'csv':
+            yield _csv([EXPORT_FIELDS])
+
+        async for partition in rows.partitions():
+            todos = [
+                TodoPublic.model_validate(row, from_attributes=True)
+                for row in partition
+            ]
+            yield (
+                _csv(_csv_rows(todos))
+                if export_format == 'csv'
+                else _ndjson(todos)
+            )
+
+
+class RecordTooLong(ValueError):
+    def __init__(self):
+        super().__init__(
+            f'Record is longer than {IMPORT_MAX_RECORD_SIZE} characters'
+        )
+
+
+def _decode(decoder, data: bytes, final: bool = False) -> str:
+    try:
+        return decoder.decode(data, final)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Upload is not valid UTF-8',
+        )
+
+
+async def _lines(chunks: AsyncIterator[bytes]):
+    # A line is never buffered past IMPORT_MAX_RECORD_SIZE: the rest of it
+    # is skipped and a RecordTooLong stands in for it.
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    overlong = False
+
+    async for chunk in chunks:
+        pending += _decode(decoder, chunk)
+        *lines, pending = pending.split('\n')
+
+        for line in lines:
+            if overlong or len(line) > IMPORT_MAX_RECORD_SIZE:
+                overlong = False
+                yield RecordTooLong()
+            else:
+                yield line.removesuffix('\r')
+
+        if len(pending) > IMPORT_MAX_RECORD_SIZE:
+            overlong = True
+            pending = ''
+
+    pending += _decode(decoder, b'', final=True)
+
+    if overlong or len(pending) > IMPORT_MAX_RECORD_SIZE:
+        yield RecordTooLong()
+    elif pending:
+        yield pending.removesuffix('\r')
+
+
+async def _records(lines, import_format: TransferFormat):
+    if import_format == 'csv':
+        async for record in _csv_records(lines):
+            yield record
+
+        return
+
+    number = 0
+
+    async for line in lines:
+        number += 1
+
+        if not isinstance(line, str) or line.strip():
+            yield number, line
+
+
+def _parse_csv(lines: list[str], final: bool) -> tuple[list, int]:
+    # Returns the records as (offset, row or error) and how many lines they
+    # used up. Unless final, a record still open at the end is left over.
+    reader = csv.reader((line + '\n' for line in lines), strict=True)
+    records = []
+    consumed = 0
+
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return records, len(lines)
+        except csv.Error as error:
+            if str(error) != 'unexpected end of data':
+                records.append((consumed, error))
+            elif final:
+                records.append((consumed, csv.Error('Unterminated quote')))
+            else:
+                return records, consumed
+        else:
+            if row:
+                records.append((consumed, row))
+
+        consumed = reader.line_num
+
+
+async def _csv_records(lines):
+    # Lines are parsed in batches, so only a record that is still open at
+    # the end of a batch is parsed twice, and IMPORT_MAX_RECORD_SIZE
+    # bounds it.
+    header = None
+    batch = []
+    first = 1
+    size = 0
+    remaining = aiter(lines)
+    final = False
+
+    while not final:
+        too_long = None
+
+        try:
+            line = await anext(remaining)
+        except StopAsyncIteration:
+            final = True
+        else:
+            if isinstance(line, RecordTooLong):
+                too_long = line
+            else:
+                batch.append(line)
+                size += len(line)
+
+                if (
+                    len(batch) < IMPORT_CHUNK_SIZE
+                    and size < IMPORT_MAX_RECORD_SIZE
+                ):
+                    continue
+
+        # an overlong line ends whatever record was open before it
+        records, consumed = _parse_csv(batch, final or too_long is not None)
+
+        for offset, row in records:
+            if header is None and isinstance(row, list):
+                header = row
+            elif isinstance(row, csv.Error):
+                yield first + offset, row
+            else:
+                yield first + offset, dict(zip(header, row))
+
+        if too_long is not None:
+            yield first + consumed, too_long
+            consumed += 1
+        # a runaway quoted field is dropped rather than buffered for good
+        elif sum(map(len, batch[consumed:])) > IMPORT_MAX_RECORD_SIZE:
+            yield first + consumed, RecordTooLong()
+            consumed = len(batch)
+
+        first += consumed
+        batch = batch[consumed:]
+        size = sum(map(len, batch))
+
+
+def _validate(payload) -> TodoSchema:
+    if isinstance(payload, (csv.Error, RecordTooLong)):
+        raise payload
+
+    if isinstance(payload, str):
+        return TodoSchema.model_validate_json(payload)
+
+    return TodoSchema.model_validate(payload)
+
+
+def _describe(error: ValidationError | csv.Error | RecordTooLong) -> str:
+    if not isinstance(error, ValidationError):
+        return str(error)
+
+    first = error.errors()[0]
+    location = '.'.join(map(str, first['loc']))
+
+    return f'{location}: {first["msg"]}' if location else first['msg']
+
+
+async def _insert(session: AsyncSession, rows: list[dict]):
+    if not rows:
+        return
+
+    if session.bind.dialect.driver == 'psycopg':
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+
+        async with raw.driver_connection.cursor() as cursor:
+            async with cursor.copy(COPY_TODOS) as copy:
+                for row in rows:
+                    row['state'] = row['state'].name
+                    await copy.write_row([row[key] for key in IMPORT_COLUMNS])
+
+        return
+
+    await session.execute(insert(Todo), rows)
+
+
+async def import_todos(
+    session: AsyncSession,
+    user_id: int,
+    chunks: AsyncIterator[bytes],
+    import_format: TransferFormat,
+) -> dict:
+    result = {'accepted': 0, 'rejected': 0, 'errors': []}
+    states = state_changes()
+
+    with SpooledTemporaryFile(
+        IMPORT_SPOOL_SIZE, mode='w+', encoding='utf-8'
+    ) as spool:
+        async for line, payload in _records(_lines(chunks), import_format):
+            try:
+                todo = _validate(payload)
+            except (ValidationError, csv.Error, RecordTooLong) as error:
+                result['rejected'] += 1
+
+                if len(result['errors']) < IMPORT_MAX_ERRORS:
+                    result['errors'].append({
+                        'line': line,
+                        'detail': _describe(error),
+                    })
+
+                continue
+
+            spool.write(
+                json.dumps([todo.title, todo.description, todo.state.value])
+                + '\n'
+            )
+            result['accepted'] += 1
+            states[todo.state] += 1
+
+        # Nothing is written until the whole upload has been read, so a slow
+        # client never holds the users row or SQLite's write lock.
+        version = await bump_todos_version(session, user_id)
+        spool.seek(0)
+        rows = []
+
+        for row in spool:
+            title, description, state = json.loads(row)
+            rows.append({
+                'title': title,
+                'description': description,
+                'state': TodoState(state),
+                'user_id': user_id,
+                'version': version,
+            })
+
+            if len(rows) == IMPORT_CHUNK_SIZE:
+                await _insert(session, rows)
+                rows = []
+
+        await _insert(session, rows)
+
+    await apply_state_deltas(session, user_id, states)
+
+    return result